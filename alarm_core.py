@@ -0,0 +1,738 @@
+import os
+import sys
+import math
+import time
+import heapq
+import bisect
+import sqlite3
+import itertools
+from datetime import datetime, date, timedelta
+from threading import Thread, Condition
+from concurrent.futures import Future
+
+# Alarm model, persistence and scheduling with no Tk dependency. The GUI in
+# sans.py is one client of AlarmEngine; run this module (or
+# `python -m sans --headless`) to drive the same engine as a daemon.
+
+class AlarmScheduler:
+    # Longest single sleep; bounds how late we notice a wall-clock jump.
+    MAX_SLEEP = 60
+    # Alarms due within this many seconds of each other fire as one group:
+    # on_fire gets a list of ids, never one call per alarm.
+    WINDOW = 5
+
+    def __init__(self, on_fire, window=WINDOW):
+        self.on_fire = on_fire
+        self.window = window
+        self._heap = []
+        self._entries = {}
+        self._stale = 0
+        self._counter = itertools.count()
+        self._cond = Condition()
+        self._stopped = False
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def schedule(self, alarm_id, deadline):
+        with self._cond:
+            self._remove(alarm_id)
+            entry = [deadline, next(self._counter), alarm_id]
+            self._entries[alarm_id] = entry
+            heapq.heappush(self._heap, entry)
+            if self._heap[0] is entry:
+                self._cond.notify()
+
+    reschedule = schedule
+
+    def schedule_many(self, alarms):
+        alarms = list(alarms)
+        with self._cond:
+            # Pushing costs O(k log n); heapify is O(n + k) and only wins
+            # when the batch is a sizeable part of the heap.
+            push = len(alarms) * 8 < len(self._heap)
+            for alarm_id, deadline in alarms:
+                self._remove(alarm_id)
+                entry = [deadline, next(self._counter), alarm_id]
+                self._entries[alarm_id] = entry
+                if push:
+                    heapq.heappush(self._heap, entry)
+                else:
+                    self._heap.append(entry)
+            if not push:
+                heapq.heapify(self._heap)
+            self._cond.notify()
+
+    def cancel(self, alarm_id):
+        with self._cond:
+            self._remove(alarm_id)
+
+    def next_deadline(self):
+        with self._cond:
+            self._drop_cancelled()
+            return self._heap[0][0] if self._heap else None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    def _remove(self, alarm_id):
+        entry = self._entries.pop(alarm_id, None)
+        if entry is not None:
+            entry[2] = None
+            self._stale += 1
+            if self._stale > len(self._entries):
+                self._heap = [e for e in self._heap if e[2] is not None]
+                heapq.heapify(self._heap)
+                self._stale = 0
+
+    def _drop_cancelled(self):
+        while self._heap and self._heap[0][2] is None:
+            heapq.heappop(self._heap)
+            self._stale -= 1
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    self._drop_cancelled()
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    delay = self._heap[0][0] - time.time()
+                    if delay <= 0:
+                        break
+                    self._cond.wait(min(delay, self.MAX_SLEEP))
+                if self._stopped:
+                    return
+                limit = max(self._heap[0][0], time.time()) + self.window
+                due = []
+                while self._heap and self._heap[0][0] <= limit:
+                    _, _, alarm_id = heapq.heappop(self._heap)
+                    if alarm_id is None:
+                        self._stale -= 1
+                        continue
+                    del self._entries[alarm_id]
+                    due.append(alarm_id)
+            self.on_fire(due)
+
+def next_daily(alarm_time, now):
+    if alarm_time > now:
+        return alarm_time
+    alarm_time += timedelta(days=(now - alarm_time).days)
+    while alarm_time <= now:
+        alarm_time += timedelta(days=1)
+    return alarm_time
+
+class ZoneOffsetCache:
+    # Per-zone index of UTC-offset transitions taken straight from pytz:
+    # its sorted UTC transition times and the offset in force from each.
+    # Converting between epoch and a zone's wall clock is a bisect, never a
+    # localize/astimezone call. offset() also keeps each zone's current
+    # window, so a clock tick is one range check until the next transition.
+    UNIX_EPOCH = datetime(1970, 1, 1)
+
+    def __init__(self):
+        self._zones = {}
+        self._tables = {}
+        self._offsets = {}
+
+    def zone(self, name):
+        tz = self._zones.get(name)
+        if tz is None:
+            import pytz
+            tz = self._zones[name] = pytz.timezone(name)
+        return tz
+
+    def table(self, name):
+        table = self._tables.get(name)
+        if table is None:
+            tz = self.zone(name)
+            times = getattr(tz, "_utc_transition_times", None)
+            if times:
+                table = (times, tz._transition_info)
+            else:
+                table = ((), ((datetime.now(tz).utcoffset(),),))
+            self._tables[name] = table
+        return table
+
+    def _index(self, name, when):
+        times, _ = self.table(name)
+        return bisect.bisect_right(times, self.UNIX_EPOCH + timedelta(seconds=when))
+
+    def _epoch(self, name, index):
+        # Epoch of transition `index`, with -inf and inf past either end, so
+        # a zone without transitions has one window covering all time.
+        times, _ = self.table(name)
+        if index < 0:
+            return float("-inf")
+        if index >= len(times):
+            return float("inf")
+        return (times[index] - self.UNIX_EPOCH).total_seconds()
+
+    def offset(self, name, now=None):
+        if now is None:
+            now = time.time()
+        entry = self._offsets.get(name)
+        if entry is None or not entry[1] <= now < entry[2]:
+            entry = self._offsets[name] = self._load(name, now)
+        return entry[0]
+
+    def offset_at(self, name, when):
+        _, infos = self.table(name)
+        return int(infos[max(self._index(name, when) - 1, 0)][0].total_seconds())
+
+    def wall(self, name, when):
+        # Naive datetime shown by the zone's clock at epoch `when`.
+        return self.UNIX_EPOCH + timedelta(seconds=when + self.offset_at(name, when))
+
+    def resolve(self, name, wall):
+        # Epoch at which the zone's clock reads `wall`. A repeated hour
+        # resolves to its first occurrence; a skipped one to the jump.
+        local = (wall - self.UNIX_EPOCH).total_seconds()
+        before = self.offset_at(name, local - 86400)
+        after = self.offset_at(name, local + 86400)
+        if before == after:
+            return local - before
+        candidates = [local - before, local - after]
+        valid = [when for when in candidates if when + self.offset_at(name, when) == local]
+        if valid:
+            return min(valid)
+        return self._epoch(name, self._index(name, min(candidates)))
+
+    def _load(self, name, now):
+        index = self._index(name, now)
+        return self.offset_at(name, now), self._epoch(name, index - 1), self._epoch(name, index)
+
+zone_offsets = ZoneOffsetCache()
+
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+WEEKDAY_SETS = {"daily": 0b1111111, "weekdays": 0b0011111, "weekends": 0b1100000}
+
+class Recurrence:
+    # A repeat rule anchored at its first occurrence. weekdays is a bitmask
+    # (bit 0 = Monday), every an interval in days from the anchor, dates and
+    # skip sorted day ordinals. Occurrences are generated one day at a time,
+    # so finding the next one never expands a calendar.
+    __slots__ = ("start", "weekdays", "every", "dates", "skip")
+    # Longest interval, in days; far larger ones would run past date.max.
+    MAX_EVERY = 10 * 366
+    LAST_DAY = date.max.toordinal()
+
+    def __init__(self, start, weekdays=0, every=0, dates=(), skip=()):
+        if not 0 <= every <= self.MAX_EVERY:
+            raise ValueError(f"interval must be between 1 and {self.MAX_EVERY} days")
+        self.start = start.replace(microsecond=0)
+        self.weekdays = weekdays
+        self.every = every
+        self.dates = tuple(sorted(set(dates)))
+        self.skip = frozenset(skip)
+        if not (weekdays or every or self.dates):
+            raise ValueError("recurrence needs weekdays, an interval or dates")
+
+    @classmethod
+    def parse(cls, text, start=None):
+        # Space-separated terms: daily, weekdays, weekends, mon,wed,fri,
+        # every:N, on:YYYY-MM-DD,..., except:YYYY-MM-DD,... and
+        # from:YYYY-MM-DDTHH:MM[:SS] (the anchor, required unless start is given).
+        weekdays = every = 0
+        dates = []
+        skip = []
+        for term in text.lower().split():
+            key, _, value = term.partition(":")
+            if key in WEEKDAY_SETS:
+                weekdays |= WEEKDAY_SETS[key]
+            elif key == "days" or (not value and key[:3] in WEEKDAYS):
+                for name in (value or key).split(","):
+                    weekdays |= 1 << WEEKDAYS.index(name[:3])
+            elif key == "every":
+                every = int(value)
+                if not 1 <= every <= cls.MAX_EVERY:
+                    raise ValueError(f"bad interval {value!r}")
+            elif key == "on":
+                dates.extend(date.fromisoformat(d).toordinal() for d in value.split(","))
+            elif key == "except":
+                skip.extend(date.fromisoformat(d).toordinal() for d in value.split(","))
+            elif key == "from":
+                start = datetime.fromisoformat(value)
+            else:
+                raise ValueError(f"unknown repeat term {term!r}")
+        if start is None:
+            raise ValueError("recurrence has no start time")
+        return cls(start, weekdays, every, dates, skip)
+
+    def __str__(self):
+        terms = ["from:" + self.start.isoformat(timespec="minutes" if not self.start.second else "seconds")]
+        if self.weekdays:
+            terms.append("days:" + ",".join(d for i, d in enumerate(WEEKDAYS) if self.weekdays >> i & 1))
+        if self.every:
+            terms.append(f"every:{self.every}")
+        if self.dates:
+            terms.append("on:" + ",".join(date.fromordinal(d).isoformat() for d in self.dates))
+        if self.skip:
+            terms.append("except:" + ",".join(date.fromordinal(d).isoformat() for d in sorted(self.skip)))
+        return " ".join(terms)
+
+    def occurrences(self, after):
+        first = max(after.date(), self.start.date()).toordinal()
+        sources = []
+        if self.weekdays:
+            sources.append(self._weekday_days(first))
+        if self.every:
+            sources.append(self._interval_days(first))
+        if self.dates:
+            sources.append(iter(self.dates[bisect.bisect_left(self.dates, first):]))
+        clock = self.start.time()
+        last = None
+        for day in heapq.merge(*sources):
+            if day == last or day in self.skip:
+                continue
+            last = day
+            moment = datetime.combine(date.fromordinal(day), clock)
+            if moment > after and moment >= self.start:
+                yield moment
+
+    def next(self, after):
+        return next(self.occurrences(after), None)
+
+    # Both generators stop at date.max, so a rule with nothing left before
+    # then has no next occurrence rather than an overflow.
+    def _weekday_days(self, day):
+        while day <= self.LAST_DAY:
+            if self.weekdays >> ((day - 1) % 7) & 1:
+                yield day
+            day += 1
+
+    def _interval_days(self, day):
+        anchor = self.start.toordinal()
+        if day > anchor:
+            anchor += -(-(day - anchor) // self.every) * self.every
+        while anchor <= self.LAST_DAY:
+            yield anchor
+            anchor += self.every
+
+class SnoozePolicy:
+    # intervals are the minutes before each successive snooze fires again;
+    # the last one repeats, so (9, 5, 3) backs off to three-minute snoozes.
+    # From the escalate_after-th snooze on, escalate_ringtone (if set)
+    # plays instead of the alarm's own ringtone.
+    MAX_MINUTES = 24 * 60
+
+    def __init__(self, intervals=(9, 5, 3), escalate_after=3, escalate_ringtone=None):
+        # Checked here, because a NaN or huge interval would only fail later
+        # in snooze_many, while the ringing group is being dismissed.
+        if not intervals or not all(math.isfinite(m) and 0 < m <= self.MAX_MINUTES for m in intervals):
+            raise ValueError(f"snooze intervals must be between 0 and {self.MAX_MINUTES} minutes")
+        self.intervals = tuple(intervals)
+        self.escalate_after = escalate_after
+        self.escalate_ringtone = escalate_ringtone
+
+    @staticmethod
+    def parse_intervals(text):
+        return tuple(float(part) for part in text.replace(",", " ").split())
+
+    def minutes(self, count):
+        return self.intervals[min(count, len(self.intervals)) - 1]
+
+    def ringtone(self, count, default):
+        if self.escalate_ringtone and count >= self.escalate_after:
+            return self.escalate_ringtone
+        return default
+
+class AlarmStore:
+    # SQLite in WAL mode; every change is its own small transaction so an
+    # add or delete writes one row instead of rewriting the whole store.
+    def __init__(self, path):
+        self.path = path
+        self.conn = None
+
+    def open(self):
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.path)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS alarms ("
+                              "id INTEGER PRIMARY KEY, fire_at REAL NOT NULL, name TEXT NOT NULL, "
+                              "rule TEXT, zone TEXT, sound TEXT)")
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(alarms)")}
+            for column in ("rule", "zone", "sound"):
+                if column not in columns:
+                    self.conn.execute(f"ALTER TABLE alarms ADD COLUMN {column} TEXT")
+        return self.conn
+
+    def load(self):
+        return self.open().execute("SELECT id, fire_at, name, rule, zone, sound FROM alarms ORDER BY id").fetchall()
+
+    def add(self, fire_at, name, rule=None, zone=None, sound=None):
+        return self.add_many([(fire_at, name, rule, zone, sound)])[0]
+
+    def add_many(self, rows):
+        conn = self.open()
+        with conn:
+            insert = "INSERT INTO alarms (fire_at, name, rule, zone, sound) VALUES (?, ?, ?, ?, ?)"
+            return [conn.execute(insert, row).lastrowid for row in rows]
+
+    def update(self, alarm_id, fire_at):
+        self.update_many([(fire_at, alarm_id)])
+
+    def update_many(self, rows):
+        conn = self.open()
+        with conn:
+            conn.executemany("UPDATE alarms SET fire_at = ? WHERE id = ?", rows)
+
+    def delete(self, alarm_id):
+        self.delete_many([alarm_id])
+
+    def delete_many(self, alarm_ids):
+        conn = self.open()
+        with conn:
+            conn.executemany("DELETE FROM alarms WHERE id = ?", [(i,) for i in alarm_ids])
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+class AlarmEngine:
+    def __init__(self, store, on_due, window=AlarmScheduler.WINDOW, offsets=zone_offsets, snooze_policy=None):
+        self.store = store
+        self.alarms = {}
+        # Only repeating alarms have an entry; one-shot alarms cost nothing.
+        self.rules = {}
+        # Alarms pinned to a time zone, whose alarm_time is that zone's wall
+        # clock; all others are in system local time.
+        self.zones = {}
+        # Ringtone per alarm, for alarms that do not use the default.
+        self.sounds = {}
+        self.offsets = offsets
+        self.snooze_policy = snooze_policy or SnoozePolicy()
+        # Times each alarm has been snoozed since it last rang on schedule.
+        self.snoozes = {}
+        self.scheduler = AlarmScheduler(on_due, window)
+
+    def deadline(self, alarm_id, alarm_time):
+        zone = self.zones.get(alarm_id)
+        if zone is None:
+            return alarm_time.timestamp()
+        return self.offsets.resolve(zone, alarm_time)
+
+    def wall_now(self, alarm_id, now):
+        # `now` (system local) as read on the alarm's own clock.
+        zone = self.zones.get(alarm_id)
+        if zone is None:
+            return now
+        return self.offsets.wall(zone, now.timestamp())
+
+    def load(self, now=None):
+        # Returns [(alarm_id, error)] for stored rows that cannot be loaded
+        # (a bad rule or unknown zone). They are left in the store but not
+        # scheduled, so one bad row cannot stop the rest from loading.
+        if now is None:
+            now = datetime.now()
+        deadlines = []
+        rolled = []
+        expired = []
+        skipped = []
+        for alarm_id, fire_at, alarm_name, rule, zone, sound in self.store.load():
+            try:
+                if sound:
+                    self.sounds[alarm_id] = sound
+                if rule:
+                    self.rules[alarm_id] = Recurrence.parse(rule)
+                if zone:
+                    self.zones[alarm_id] = zone
+                    alarm_time = self.offsets.wall(zone, fire_at)
+                else:
+                    alarm_time = datetime.fromtimestamp(fire_at)
+                if fire_at <= now.timestamp():
+                    alarm_time = self.following(alarm_id, alarm_time, now)
+                    if alarm_time is None:
+                        self.rules.pop(alarm_id, None)
+                        self.zones.pop(alarm_id, None)
+                        self.sounds.pop(alarm_id, None)
+                        expired.append(alarm_id)
+                        continue
+                    fire_at = self.deadline(alarm_id, alarm_time)
+                    rolled.append((fire_at, alarm_id))
+            except (ValueError, KeyError, OverflowError, OSError) as e:
+                self.rules.pop(alarm_id, None)
+                self.zones.pop(alarm_id, None)
+                self.sounds.pop(alarm_id, None)
+                skipped.append((alarm_id, f"{type(e).__name__}: {e}"))
+                continue
+            self.alarms[alarm_id] = (alarm_time, alarm_name)
+            deadlines.append((alarm_id, fire_at))
+        if rolled:
+            self.store.update_many(rolled)
+        if expired:
+            self.store.delete_many(expired)
+        self.scheduler.schedule_many(deadlines)
+        return skipped
+
+    def following(self, alarm_id, alarm_time, now):
+        # The next time after now: the rule's next occurrence for repeating
+        # alarms (None once it has run out), the same clock time for others.
+        now = self.wall_now(alarm_id, now)
+        rule = self.rules.get(alarm_id)
+        if rule is None:
+            return next_daily(alarm_time, now)
+        return rule.next(max(alarm_time, now))
+
+    def add(self, alarm_time, alarm_name, rule=None, zone=None, sound=None):
+        return self.add_many([(alarm_time, alarm_name, rule, zone, sound)])[0]
+
+    def add_many(self, items):
+        # Items are (alarm_time, alarm_name[, rule[, zone[, sound]]]). rule
+        # is a Recurrence, its text form or None; a repeating alarm starts at
+        # its first occurrence at or after alarm_time. zone pins alarm_time
+        # to that zone's wall clock. sound is the alarm's own ringtone.
+        alarms = []
+        extras = []
+        for alarm_time, alarm_name, *rest in items:
+            rule, zone, sound = (list(rest) + [None, None, None])[:3]
+            if zone is not None:
+                self.offsets.table(zone)
+            if rule is not None:
+                alarm_time = alarm_time.replace(microsecond=0)
+            if isinstance(rule, str):
+                rule = Recurrence.parse(rule, alarm_time)
+            if rule is not None:
+                alarm_time = rule.next(alarm_time - timedelta(microseconds=1))
+                if alarm_time is None:
+                    raise ValueError(f"{alarm_name!r} repeats only on past dates")
+            alarms.append((alarm_time, alarm_name))
+            extras.append((rule, zone, sound))
+        deadlines = [self.offsets.resolve(zone, alarm_time) if zone else alarm_time.timestamp()
+                     for (alarm_time, _), (_, zone, _) in zip(alarms, extras)]
+        ids = self.store.add_many([(fire_at, alarm_name, rule and str(rule), zone, sound)
+                                   for fire_at, (_, alarm_name), (rule, zone, sound) in zip(deadlines, alarms, extras)])
+        for alarm_id, item, (rule, zone, sound) in zip(ids, alarms, extras):
+            self.alarms[alarm_id] = item
+            if rule is not None:
+                self.rules[alarm_id] = rule
+            if zone is not None:
+                self.zones[alarm_id] = zone
+            if sound:
+                self.sounds[alarm_id] = sound
+        self.scheduler.schedule_many(zip(ids, deadlines))
+        return ids
+
+    def iter_alarms(self):
+        # Walks a copy of the ids, not the dict itself, so the control
+        # socket can page through it while other calls add or delete alarms.
+        rules = self.rules
+        for alarm_id in list(self.alarms):
+            entry = self.alarms.get(alarm_id)
+            if entry is None:
+                continue
+            alarm_time, alarm_name = entry
+            yield (alarm_id, alarm_time, alarm_name, str(rules[alarm_id]) if alarm_id in rules else None,
+                   self.zones.get(alarm_id), self.sounds.get(alarm_id))
+
+    def delete(self, alarm_id):
+        return bool(self.delete_many([alarm_id]))
+
+    def delete_many(self, alarm_ids):
+        deleted = [i for i in alarm_ids if self.alarms.pop(i, None) is not None]
+        for alarm_id in deleted:
+            self.rules.pop(alarm_id, None)
+            self.zones.pop(alarm_id, None)
+            self.sounds.pop(alarm_id, None)
+            self.snoozes.pop(alarm_id, None)
+        if deleted:
+            self.store.delete_many(deleted)
+            for alarm_id in deleted:
+                self.scheduler.cancel(alarm_id)
+        return deleted
+
+    def reschedule(self, alarm_id, alarm_time):
+        self.reschedule_many([(alarm_id, alarm_time)])
+
+    def reschedule_many(self, items):
+        for alarm_id, alarm_time in items:
+            _, alarm_name = self.alarms[alarm_id]
+            self.alarms[alarm_id] = (alarm_time, alarm_name)
+        deadlines = [(alarm_id, self.deadline(alarm_id, alarm_time)) for alarm_id, alarm_time in items]
+        self.store.update_many([(fire_at, alarm_id) for alarm_id, fire_at in deadlines])
+        self.scheduler.schedule_many(deadlines)
+
+    def complete_many(self, alarm_ids, now=None):
+        # Handled alarms: repeating ones move to their next occurrence, the
+        # rest are deleted. Returns (moved ids, deleted ids).
+        if now is None:
+            now = datetime.now()
+        moved = []
+        done = []
+        for alarm_id in alarm_ids:
+            if alarm_id not in self.alarms:
+                continue
+            rule = self.rules.get(alarm_id)
+            following = rule and rule.next(max(self.alarms[alarm_id][0], self.wall_now(alarm_id, now)))
+            if following is None:
+                done.append(alarm_id)
+            else:
+                moved.append((alarm_id, following))
+        if moved:
+            self.reschedule_many(moved)
+            for alarm_id, _ in moved:
+                self.snoozes.pop(alarm_id, None)
+        return [alarm_id for alarm_id, _ in moved], self.delete_many(done)
+
+    def snooze(self, alarm_id, minutes, now=None):
+        # Same bound as the policy's intervals: a huge value would overflow
+        # and a negative one would snooze into the past and ring at once.
+        if not (math.isfinite(minutes) and 0 < minutes <= SnoozePolicy.MAX_MINUTES):
+            raise ValueError(f"snooze must be between 0 and {SnoozePolicy.MAX_MINUTES} minutes")
+        if alarm_id not in self.alarms:
+            return None
+        alarm_time = self.wall_now(alarm_id, now or datetime.now()) + timedelta(minutes=minutes)
+        self.reschedule(alarm_id, alarm_time)
+        return alarm_time
+
+    def snooze_many(self, alarm_ids, now=None):
+        # Pushes each alarm back into the scheduler by the policy's next
+        # interval. Returns [(alarm_id, alarm_time)] for the moved alarms.
+        if now is None:
+            now = datetime.now()
+        moved = []
+        for alarm_id in alarm_ids:
+            if alarm_id not in self.alarms:
+                continue
+            count = self.snoozes[alarm_id] = self.snoozes.get(alarm_id, 0) + 1
+            minutes = self.snooze_policy.minutes(count)
+            moved.append((alarm_id, self.wall_now(alarm_id, now) + timedelta(minutes=minutes)))
+        if moved:
+            self.reschedule_many(moved)
+        return moved
+
+    def ringtones(self, alarm_ids, default):
+        # The distinct ringtones for a group of ringing alarms, or just the
+        # escalation ringtone once any of them has been snoozed enough.
+        count = max((self.snoozes.get(alarm_id, 0) for alarm_id in alarm_ids), default=0)
+        escalated = self.snooze_policy.ringtone(count, None)
+        if escalated:
+            return [escalated]
+        return list(dict.fromkeys(self.sounds.get(alarm_id, default) for alarm_id in alarm_ids))
+
+    def close(self):
+        self.scheduler.stop()
+        self.store.close()
+
+def parse_alarm_time(text, now=None, zone=None):
+    # HH:MM is the next such time on the zone's clock (system local when
+    # zone is None); anything else must be an ISO datetime.
+    if len(text) > 5:
+        return datetime.fromisoformat(text)
+    if now is None:
+        now = zone_offsets.wall(zone, time.time()) if zone else datetime.now()
+    alarm_time = datetime.combine(now.date(), datetime.strptime(text, "%H:%M").time())
+    if alarm_time <= now:
+        alarm_time += timedelta(days=1)
+    return alarm_time
+
+def alarm_item(alarm_time, name, repeat=None, zone=None, sound=None, now=None):
+    # Checks everything AlarmEngine.add_many would otherwise fail on and
+    # returns its item, so importers and the control socket can reject one
+    # bad alarm instead of aborting a batch. A time with a UTC offset
+    # becomes system local time; past one-shot times are rejected.
+    for field, value in (("name", name), ("sound", sound)):
+        if value is not None and not isinstance(value, str):
+            raise ValueError(f"{field} must be a string")
+    if zone:
+        try:
+            zone_offsets.table(zone)
+        except KeyError:
+            raise ValueError(f"unknown time zone {zone!r}")
+    if isinstance(alarm_time, str):
+        alarm_time = parse_alarm_time(alarm_time, zone=zone)
+    if alarm_time.tzinfo is not None:
+        if zone:
+            raise ValueError("time has both a UTC offset and a zone")
+        alarm_time = datetime.fromtimestamp(alarm_time.timestamp())
+    if now is None:
+        now = zone_offsets.wall(zone, time.time()) if zone else datetime.now()
+    rule = None
+    if repeat:
+        start = alarm_time.replace(microsecond=0)
+        rule = repeat if isinstance(repeat, Recurrence) else Recurrence.parse(repeat, start)
+        # A rule anchored in the past starts at its next occurrence, not
+        # with a burst of missed ones.
+        alarm_time = rule.next(max(start, now) - timedelta(microseconds=1))
+        if alarm_time is None:
+            raise ValueError("repeats only on past dates")
+    elif alarm_time <= now:
+        raise ValueError(f"{alarm_time.isoformat(timespec='minutes')} is in the past")
+    return alarm_time, name or "Alarm", rule, zone or None, sound or None
+
+def deferred_call(func, *args):
+    # Wraps func so another thread can run it and hand the result back
+    # through a Future.
+    future = Future()
+
+    def run():
+        if future.set_running_or_notify_cancel():
+            try:
+                future.set_result(func(*args))
+            except Exception as e:
+                future.set_exception(e)
+    return future, run
+
+def run_headless(db_path, ringtone="default_alarm.wav"):
+    import queue
+    import signal
+    import audio
+    import alarm_ipc
+
+    # The main thread blocks on the queue; the scheduler thread feeds it
+    # groups of due alarm ids and the control server feeds it calls to run
+    # against the engine, so the daemon does no polling of its own.
+    fired = queue.Queue()
+    engine = AlarmEngine(AlarmStore(db_path), fired.put)
+    for alarm_id, error in engine.load():
+        print(f"Skipping stored alarm {alarm_id}: {error}")
+
+    def call(func, *args):
+        future, run = deferred_call(func, *args)
+        fired.put(run)
+        return future
+
+    alarm_ipc.start_server(call, {
+        "add": engine.add_many,
+        "delete": engine.delete,
+        "snooze": engine.snooze,
+        "list": engine.iter_alarms,
+    })
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print(f"Alarm daemon running with {len(engine.alarms)} alarms from {db_path}")
+    try:
+        while True:
+            item = fired.get()
+            if callable(item):
+                item()
+                continue
+            alarm_ids = [i for i in item if i in engine.alarms]
+            if not alarm_ids:
+                continue
+            for alarm_id in alarm_ids:
+                print(f"Time to Wake up - {engine.alarms[alarm_id][1]}", flush=True)
+            for path in engine.ringtones(alarm_ids, ringtone):
+                audio.get_engine().play(path, key=f"alarm:{path}")
+            engine.complete_many(alarm_ids)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.close()
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Alarm engine")
+    parser.add_argument("--headless", action="store_true", help="run the alarm daemon without a GUI")
+    parser.add_argument("--db", default=os.environ.get("ALARM_DB", "alarms.db"), help="alarm store path")
+    args = parser.parse_args(argv)
+    run_headless(args.db)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+import csv
+import time
+from datetime import datetime, timedelta
+
+from alarm_core import Recurrence, WEEKDAYS, alarm_item, zone_offsets
+
+# Bulk import and export of alarms as CSV (columns time, name, repeat, zone,
+# sound) or iCalendar (one VEVENT per alarm, its VALARM carrying the
+# sound). Readers are generators over the open file: each row or event is
+# validated as it is read and either yielded as an AlarmEngine.add_many
+# item or recorded in the ImportReport, so the whole file goes into one
+# add_many call in a single pass. The file text is never held in memory,
+# but add_many keeps the parsed batch until its one transaction commits,
+# on top of the engine's own in-memory copy of every alarm. Writers emit
+# one row or event per alarm from AlarmEngine.iter_alarms.
+
+CSV_FIELDS = ("time", "name", "repeat", "zone", "sound")
+MAX_ERRORS = 200
+ICS_DAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+
+class FileFormatError(ValueError):
+    # The file itself cannot be read (not UTF-8 text), as opposed to one
+    # bad row. Raised before add_many stores anything.
+    pass
+
+class ImportReport:
+    # Every rejected row is counted; only the first MAX_ERRORS messages
+    # are kept.
+    def __init__(self, source):
+        self.source = source
+        self.accepted = 0
+        self.rejected = 0
+        self.errors = []
+
+    def error(self, where, message):
+        self.rejected += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append(f"{where}: {message}")
+
+    def summary(self):
+        text = f"Imported {self.accepted} alarms from {self.source}"
+        if self.rejected:
+            text += f", skipped {self.rejected}:\n" + "\n".join(self.errors)
+            if self.rejected > len(self.errors):
+                text += f"\n... and {self.rejected - len(self.errors)} more"
+        return text
+
+def decoded(rows):
+    # Lets read_csv and read_ics iterate a text file as usual while turning
+    # a decode failure into FileFormatError. Text is decoded a block at a
+    # time, so there is no meaningful line number to report.
+    rows = iter(rows)
+    while True:
+        try:
+            row = next(rows)
+        except StopIteration:
+            return
+        except UnicodeDecodeError as e:
+            raise FileFormatError(f"the file is not UTF-8 text ({e.reason}); save it as UTF-8 and import it again")
+        yield row
+
+def csv_rows(reader, report):
+    # A csv.Error (such as an oversized field) rejects one row; the reader
+    # carries on with the next.
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            report.error(f"near line {reader.line_num + 1}", e)
+            continue
+        yield row
+
+def read_csv(f, report):
+    reader = csv.DictReader(decoded(f))
+    try:
+        if reader.fieldnames is None:
+            return
+    except csv.Error as e:
+        report.error("header", e)
+        return
+    unknown = [name for name in reader.fieldnames if name not in CSV_FIELDS]
+    if "time" not in reader.fieldnames or unknown:
+        report.error("header", f"expected columns {', '.join(CSV_FIELDS)}")
+        return
+    now = datetime.now()
+    for row in csv_rows(reader, report):
+        try:
+            if None in row:
+                raise ValueError("too many fields")
+            if not row["time"]:
+                raise ValueError("missing time")
+            zone = row.get("zone") or None
+            yield alarm_item(row["time"].strip(), (row.get("name") or "").strip(), (row.get("repeat") or "").strip(),
+                             zone and zone.strip(), (row.get("sound") or "").strip(),
+                             None if zone else now)
+            report.accepted += 1
+        except (ValueError, TypeError) as e:
+            report.error(f"line {reader.line_num}", e)
+
+def write_csv(f, alarms):
+    writer = csv.writer(f)
+    writer.writerow(CSV_FIELDS)
+    for alarm_id, alarm_time, name, rule, zone, sound in alarms:
+        writer.writerow([alarm_time.isoformat(timespec="seconds"), name, rule or "", zone or "", sound or ""])
+
+def unfolded_lines(f):
+    # Content lines with RFC 5545 folding undone; yields (line number of
+    # the first physical line, text).
+    pending = None
+    start = 0
+    for number, line in enumerate(f, 1):
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and pending is not None:
+            pending += line[1:]
+            continue
+        if pending:
+            yield start, pending
+        pending, start = line, number
+    if pending:
+        yield start, pending
+
+def parse_line(line):
+    head, sep, value = line.partition(":")
+    if not sep:
+        raise ValueError(f"malformed line {line[:40]!r}")
+    name, *params = head.split(";")
+    return name.upper(), dict(p.partition("=")[::2] for p in params), value
+
+def unescape(text):
+    out = []
+    chars = iter(text)
+    for c in chars:
+        if c == "\\":
+            c = next(chars, "")
+            c = "\n" if c in ("n", "N") else c
+        out.append(c)
+    return "".join(out)
+
+def escape(text):
+    return text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+def parse_ics_time(value, params):
+    # Returns (naive datetime, zone): TZID times stay on that zone's clock,
+    # UTC times become system local, floating times are local already.
+    if params.get("VALUE") == "DATE":
+        return datetime.strptime(value, "%Y%m%d"), None
+    if value.endswith("Z"):
+        utc = datetime.strptime(value[:-1], "%Y%m%dT%H%M%S")
+        return datetime.fromtimestamp((utc - zone_offsets.UNIX_EPOCH).total_seconds()), None
+    return datetime.strptime(value, "%Y%m%dT%H%M%S"), params.get("TZID")
+
+def parse_duration(value):
+    sign = -1 if value.startswith("-") else 1
+    value = value.lstrip("+-")
+    if not value.startswith("P"):
+        raise ValueError(f"bad duration {value!r}")
+    total = 0
+    number = ""
+    units = {"W": 604800, "D": 86400, "H": 3600, "M": 60, "S": 1}
+    for c in value[1:]:
+        if c.isdigit():
+            number += c
+        elif c == "T":
+            continue
+        elif c in units and number:
+            total += int(number) * units[c]
+            number = ""
+        else:
+            raise ValueError(f"bad duration {value!r}")
+    return timedelta(seconds=sign * total)
+
+def rrule_terms(value, start):
+    # The RRULE subset a Recurrence can express: daily or weekly, with an
+    # interval and BYDAY, and no end.
+    parts = dict(p.partition("=")[::2] for p in value.upper().split(";"))
+    freq = parts.pop("FREQ", None)
+    interval = int(parts.pop("INTERVAL", 1))
+    byday = parts.pop("BYDAY", None)
+    parts.pop("WKST", None)
+    if parts:
+        raise ValueError(f"unsupported RRULE part {next(iter(parts))}")
+    if freq == "DAILY" and not byday:
+        return [f"every:{interval}"]
+    if freq == "DAILY" and interval == 1:
+        freq = "WEEKLY"
+    if freq == "WEEKLY":
+        if byday is None:
+            return [f"every:{7 * interval}"] if interval > 1 else [WEEKDAYS[start.weekday()]]
+        if interval == 1:
+            return ["days:" + ",".join(WEEKDAYS[ICS_DAYS.index(d)] for d in byday.split(","))]
+    raise ValueError(f"unsupported RRULE {value}")
+
+def ics_dates(value, params):
+    return ",".join(parse_ics_time(v, params)[0].date().isoformat() for v in value.split(","))
+
+def read_ics(f, report):
+    now = datetime.now()
+    event = None
+    in_alarm = False
+    for number, line in decoded(unfolded_lines(f)):
+        try:
+            name, params, value = parse_line(line)
+        except ValueError as e:
+            if event is not None:
+                event["error"] = event.get("error") or str(e)
+            else:
+                report.error(f"line {number}", e)
+            continue
+        if name == "BEGIN" and value.upper() == "VEVENT":
+            event = {"line": number, "rrules": []}
+        elif event is None:
+            continue
+        elif name == "BEGIN" and value.upper() == "VALARM":
+            in_alarm = True
+        elif name == "END" and value.upper() == "VALARM":
+            in_alarm = False
+        elif name == "END" and value.upper() == "VEVENT":
+            try:
+                yield ics_item(event, now)
+                report.accepted += 1
+            except (ValueError, TypeError, KeyError) as e:
+                report.error(f"event at line {event['line']}", e)
+            event = None
+        elif in_alarm:
+            if name == "TRIGGER":
+                event["trigger"] = (value, params)
+            elif name == "ATTACH" and params.get("VALUE", "URI") == "URI":
+                event["sound"] = value[len("file://"):] if value.startswith("file://") else value
+        elif name == "RRULE":
+            event["rrules"].append(value)
+        else:
+            event.setdefault("fields", {})[name] = (value, params)
+
+def ics_item(event, now):
+    if "error" in event:
+        raise ValueError(event["error"])
+    fields = event.get("fields", {})
+    if "DTSTART" not in fields:
+        raise ValueError("missing DTSTART")
+    start, zone = parse_ics_time(*fields["DTSTART"])
+    name = unescape(fields.get("SUMMARY", ("", {}))[0]).strip()
+    alarm_time = start
+    trigger = event.get("trigger")
+    if trigger is not None:
+        value, params = trigger
+        if params.get("VALUE") == "DATE-TIME":
+            alarm_time, zone = parse_ics_time(value, params)
+        elif params.get("RELATED", "START") == "START":
+            alarm_time = start + parse_duration(value)
+    repeat = None
+    if "X-ALARM-REPEAT" in fields:
+        repeat = fields["X-ALARM-REPEAT"][0]
+    elif event["rrules"] or "RDATE" in fields:
+        terms = []
+        for rrule in event["rrules"]:
+            terms += rrule_terms(rrule, start)
+        if "RDATE" in fields:
+            terms.append("on:" + ics_dates(*fields["RDATE"]))
+        if "EXDATE" in fields:
+            terms.append("except:" + ics_dates(*fields["EXDATE"]))
+        repeat = " ".join(terms)
+    return alarm_item(alarm_time, name, repeat, zone, event.get("sound"), None if zone else now)
+
+def fold(line):
+    # Content lines are limited to 75 octets; continuation lines start
+    # with a space.
+    data = line.encode()
+    if len(data) <= 75:
+        return line + "\r\n"
+    parts = []
+    while data:
+        cut = 75 if not parts else 74
+        while cut < len(data) and (data[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(data[:cut].decode())
+        data = data[cut:]
+    return "\r\n ".join(parts) + "\r\n"
+
+def ics_rrules(rule):
+    if rule.weekdays:
+        yield "FREQ=WEEKLY;BYDAY=" + ",".join(d for i, d in enumerate(ICS_DAYS) if rule.weekdays >> i & 1)
+    if rule.every:
+        yield f"FREQ=DAILY;INTERVAL={rule.every}"
+
+def write_ics(f, alarms):
+    f.write("BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//SANS//Alarm Clock//EN\r\n")
+    stamp = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+    for alarm_id, alarm_time, name, rule, zone, sound in alarms:
+        start = alarm_time.strftime("%Y%m%dT%H%M%S")
+        lines = ["BEGIN:VEVENT", f"UID:alarm-{alarm_id}@sans", f"DTSTAMP:{stamp}",
+                 f"DTSTART;TZID={zone}:{start}" if zone else f"DTSTART:{start}",
+                 "SUMMARY:" + escape(name)]
+        if rule:
+            # X-ALARM-REPEAT keeps the rule exact on re-import; the RRULE,
+            # RDATE and EXDATE lines are for other calendars.
+            recurrence = Recurrence.parse(rule)
+            lines.append("X-ALARM-REPEAT:" + rule)
+            lines += ["RRULE:" + r for r in ics_rrules(recurrence)]
+            if recurrence.dates:
+                lines.append("RDATE;VALUE=DATE:" + ",".join(datetime.fromordinal(d).strftime("%Y%m%d")
+                                                             for d in recurrence.dates))
+            if recurrence.skip:
+                lines.append("EXDATE;VALUE=DATE:" + ",".join(datetime.fromordinal(d).strftime("%Y%m%d")
+                                                              for d in sorted(recurrence.skip)))
+        lines += ["BEGIN:VALARM", "ACTION:AUDIO", "TRIGGER:PT0S"]
+        if sound:
+            lines.append("ATTACH:" + sound)
+        lines += ["END:VALARM", "END:VEVENT"]
+        f.write("".join(fold(line) for line in lines))
+    f.write("END:VCALENDAR\r\n")
+
+def is_ics(path):
+    return path.lower().endswith((".ics", ".ical", ".ifb", ".icalendar"))
+
+def read_alarms(f, report, ics=False):
+    return read_ics(f, report) if ics else read_csv(f, report)
+
+def write_alarms(f, alarms, ics=False):
+    (write_ics if ics else write_csv)(f, alarms)
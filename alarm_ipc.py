@@ -0,0 +1,235 @@
+import os
+import sys
+import json
+import socket
+import asyncio
+import tempfile
+from itertools import islice
+from threading import Thread
+
+from alarm_core import alarm_item
+
+# Newline-delimited JSON control API on a Unix socket. Each request is one
+# object with an "op" of add, bulk-add, delete, snooze or list (adds take
+# "time" and optional "name", "repeat" rule, "zone" and "sound"); each
+# reply is one object carrying "ok", except that list first streams one
+# object per alarm. bulk-add checks each alarm on its own, adds the valid
+# ones in one transaction and replies with "ids" (null where rejected) and
+# "errors" ({"index", "error"} per rejected alarm). Handlers run on the thread that owns the alarm engine via `call`,
+# which returns a concurrent.futures.Future.
+
+BATCH_SIZE = 1000
+
+def default_socket_path():
+    path = os.environ.get("ALARM_SOCKET")
+    if path:
+        return path
+    # The per-user runtime directory is private; the shared temp directory
+    # is only a fallback.
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime and os.path.isdir(runtime):
+        return os.path.join(runtime, "alarm_app.sock")
+    return os.path.join(tempfile.gettempdir(), f"alarm_app-{os.getuid()}.sock")
+
+def socket_in_use(path):
+    # A socket file left by a crashed instance refuses connections and may
+    # be replaced; one that answers belongs to a running instance.
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        probe.close()
+
+def alarm_json(alarm_id, alarm_time, alarm_name, rule=None, zone=None, sound=None):
+    alarm = {"id": alarm_id, "time": alarm_time.isoformat(timespec="seconds"), "name": alarm_name}
+    if rule:
+        alarm["repeat"] = rule
+    if zone:
+        alarm["zone"] = zone
+    if sound:
+        alarm["sound"] = sound
+    return alarm
+
+def request_item(request):
+    return alarm_item(request["time"], request.get("name"), request.get("repeat"), request.get("zone"),
+                      request.get("sound"))
+
+def error_text(e):
+    return f"{type(e).__name__}: {e}"
+
+class ControlServer:
+    def __init__(self, path, call, handlers):
+        self.path = path
+        self.call = call
+        self.handlers = handlers
+        self.loop = None
+        self.server = None
+
+    def start(self):
+        Thread(target=asyncio.run, args=(self.serve(),), daemon=True).start()
+        return self
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self.server = await asyncio.start_unix_server(self.client, path=self.path, limit=1 << 24)
+        os.chmod(self.path, 0o600)
+        async with self.server:
+            try:
+                await self.server.serve_forever()
+            except asyncio.CancelledError:
+                pass
+
+    def stop(self):
+        if self.loop is not None and self.server is not None:
+            self.loop.call_soon_threadsafe(self.server.close)
+
+    async def run(self, name, *args):
+        return await self.run_func(self.handlers[name], *args)
+
+    async def run_func(self, func, *args):
+        return await asyncio.wrap_future(self.call(func, *args))
+
+    async def client(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                # Any failure, including one raised by the engine, becomes an
+                # error reply instead of a dropped connection.
+                try:
+                    request = json.loads(line)
+                    reply = await self.handle(request, writer)
+                except Exception as e:
+                    reply = {"ok": False, "error": error_text(e)}
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def handle(self, request, writer):
+        op = request["op"]
+        if op == "add":
+            ids = await self.run("add", [request_item(request)])
+            return {"ok": True, "id": ids[0]}
+        if op == "bulk-add":
+            items = []
+            errors = []
+            for index, alarm in enumerate(request["alarms"]):
+                try:
+                    items.append(request_item(alarm))
+                except (ValueError, KeyError, TypeError, AttributeError) as e:
+                    errors.append({"index": index, "error": error_text(e)})
+            added = iter(await self.run("add", items) if items else ())
+            rejected = {error["index"] for error in errors}
+            ids = [None if index in rejected else next(added) for index in range(len(request["alarms"]))]
+            reply = {"ok": not errors, "ids": ids}
+            if errors:
+                reply["errors"] = errors
+            return reply
+        if op == "delete":
+            if not await self.run("delete", int(request["id"])):
+                return {"ok": False, "error": "no such alarm"}
+            return {"ok": True}
+        if op == "snooze":
+            alarm_time = await self.run("snooze", int(request["id"]), float(request.get("minutes", 5)))
+            if alarm_time is None:
+                return {"ok": False, "error": "no such alarm"}
+            return {"ok": True, "time": alarm_time.isoformat(timespec="seconds")}
+        if op == "list":
+            # The handler returns an iterator; each page of BATCH_SIZE alarms
+            # is read on the engine's thread, then written and drained before
+            # the next, so neither side holds the whole list.
+            alarms = await self.run("list")
+            count = 0
+            while True:
+                page = await self.run_func(list, islice(alarms, BATCH_SIZE))
+                if not page:
+                    break
+                for alarm in page:
+                    writer.write(json.dumps(alarm_json(*alarm)).encode() + b"\n")
+                count += len(page)
+                await writer.drain()
+            return {"ok": True, "count": count}
+        raise ValueError(f"unknown op {op!r}")
+
+def start_server(call, handlers, path=None):
+    if not hasattr(socket, "AF_UNIX") or os.environ.get("ALARM_SOCKET") == "off":
+        return None
+    path = path or default_socket_path()
+    if socket_in_use(path):
+        print(f"Control socket {path} is in use by another instance; not starting the control server")
+        return None
+    return ControlServer(path, call, handlers).start()
+
+def batched_requests(lines):
+    # Consecutive adds are folded into bulk-add requests so a piped file of
+    # thousands of alarms costs a handful of round trips and transactions.
+    # Yields (request, folded): folded is True for a bulk-add built here,
+    # whose reply split_reply turns back into one reply per add line.
+    pending = []
+    for line in lines:
+        if not line.strip():
+            continue
+        request = json.loads(line)
+        if request.get("op") == "add":
+            request = dict(request)
+            del request["op"]
+            pending.append(request)
+            if len(pending) >= BATCH_SIZE:
+                yield {"op": "bulk-add", "alarms": pending}, True
+                pending = []
+            continue
+        if pending:
+            yield {"op": "bulk-add", "alarms": pending}, True
+            pending = []
+        yield request, False
+    if pending:
+        yield {"op": "bulk-add", "alarms": pending}, True
+
+def split_reply(request, reply):
+    if "ids" not in reply:
+        return [reply] * len(request["alarms"])
+    errors = {error["index"]: error["error"] for error in reply.get("errors", ())}
+    return [{"ok": True, "id": alarm_id} if alarm_id is not None else {"ok": False, "error": errors.get(index)}
+            for index, alarm_id in enumerate(reply["ids"])]
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Send NDJSON commands to a running alarm app")
+    parser.add_argument("--socket", default=default_socket_path(), help="control socket path")
+    parser.add_argument("requests", nargs="*", help="JSON requests; read from stdin when omitted")
+    args = parser.parse_args(argv)
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(args.socket)
+    replies = sock.makefile("rb")
+    out = sys.stdout
+    failed = False
+    for request, folded in batched_requests(args.requests or sys.stdin):
+        sock.sendall(json.dumps(request).encode() + b"\n")
+        for line in replies:
+            reply = json.loads(line)
+            if "ok" not in reply:
+                out.write(line.decode())
+                continue
+            failed |= not reply["ok"]
+            if folded:
+                out.writelines(json.dumps(r) + "\n" for r in split_reply(request, reply))
+            else:
+                out.write(line.decode())
+            break
+    sock.close()
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
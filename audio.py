@@ -0,0 +1,397 @@
+import os
+import sys
+import math
+import time
+import shutil
+import subprocess
+import wave
+import mmap
+import operator
+from array import array
+from collections import OrderedDict
+from itertools import repeat
+from threading import Thread, Lock
+
+# Ringtones are decoded once into a small LRU of shared memory maps, and
+# every sound playing one reads fixed-size chunks from that map and mixes
+# them into one output stream. Alarms and timers can sound at the same time,
+# a looping ringtone never goes back to the file, and memory per playing
+# sound stays at one chunk whatever the file sizes.
+
+CHANNELS = 2
+SAMPLE_WIDTH = 2
+RATE = 44100
+CHUNK_FRAMES = 4096
+FRAME_BYTES = CHANNELS * SAMPLE_WIDTH
+DECODE_FRAMES = 65536
+
+def wav_data_chunk(f):
+    # (offset, length) of the data chunk, found by walking the RIFF chunks.
+    header = f.read(12)
+    if header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+        raise wave.Error("not a WAV file")
+    while True:
+        chunk = f.read(8)
+        if len(chunk) < 8:
+            raise wave.Error("no data chunk")
+        size = int.from_bytes(chunk[4:], "little")
+        if chunk[:4] == b"data":
+            return f.tell(), size
+        f.seek(size + (size & 1), 1)
+
+def to_16bit_stereo(data, channels, sample_width):
+    if sample_width == 2:
+        samples = array("h", data)
+    elif sample_width == 1:
+        samples = array("h", [(b - 128) << 8 for b in data])
+    else:
+        samples = array("h", [s >> 16 for s in array("i", data)])
+    if channels == 1:
+        stereo = array("h", bytes(len(samples) * 4))
+        stereo[0::2] = samples
+        stereo[1::2] = samples
+        samples = stereo
+    return samples
+
+class Pcm:
+    # A ringtone as 16-bit stereo at its own sample rate. data is a view of
+    # an mmap: of the file's data chunk when it is already in that format,
+    # otherwise of an anonymous map it was converted into once.
+    def __init__(self, data, rate):
+        self.data = data
+        self.rate = rate
+        self.frames = len(data) // FRAME_BYTES
+
+def decode_wav(path):
+    with wave.open(path, "rb") as wav:
+        channels = wav.getnchannels()
+        sample_width = wav.getsampwidth()
+        rate = wav.getframerate()
+        frames = wav.getnframes()
+        if channels not in (1, 2) or sample_width not in (1, 2, 4):
+            raise wave.Error(f"unsupported format: {channels} channels, {sample_width * 8}-bit")
+        if frames == 0:
+            raise wave.Error("no audio frames")
+        if channels == CHANNELS and sample_width == SAMPLE_WIDTH:
+            with open(path, "rb") as f:
+                offset, length = wav_data_chunk(f)
+                mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            length = min(length, len(mapping) - offset, frames * FRAME_BYTES)
+            return Pcm(memoryview(mapping)[offset:offset + length - length % FRAME_BYTES], rate)
+        mapping = mmap.mmap(-1, frames * FRAME_BYTES)
+        written = 0
+        while written < len(mapping):
+            data = wav.readframes(DECODE_FRAMES)
+            if not data:
+                break
+            chunk = to_16bit_stereo(data, channels, sample_width).tobytes()
+            mapping[written:written + len(chunk)] = chunk
+            written += len(chunk)
+        return Pcm(memoryview(mapping)[:written], rate)
+
+class PcmCache:
+    # The most recently played ringtones, keyed by path and mtime. Evicted
+    # maps are only dropped, since sounds still playing them hold views.
+    def __init__(self, size=8):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path):
+        key = (path, os.path.getmtime(path))
+        with self._lock:
+            pcm = self._entries.get(key)
+            if pcm is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return pcm
+        pcm = decode_wav(path)
+        with self._lock:
+            self.misses += 1
+            for old in [k for k in self._entries if k[0] == path]:
+                del self._entries[old]
+            self._entries[key] = pcm
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return pcm
+
+class WavSource:
+    # One playing sound: a position in a shared Pcm, converted chunk by
+    # chunk to the mixer's rate. Looping sources wrap around in memory.
+    def __init__(self, pcm, loop=False):
+        self.pcm = pcm
+        self.loop = loop
+        self.step = pcm.rate / RATE
+        self.position = 0.0
+        self.finished = False
+
+    def read(self, frames):
+        # Returns frames of output audio, padded with silence at the end of
+        # a one-shot source, or None once it has finished.
+        if self.finished:
+            return None
+        data = self.pcm.data
+        total = self.pcm.frames
+        start = int(self.position)
+        wanted = int(self.position + frames * self.step) - start
+        end = start + wanted
+        available = frames
+        if end <= total:
+            chunk = data[start * FRAME_BYTES:end * FRAME_BYTES]
+        elif self.loop:
+            parts = [data[start * FRAME_BYTES:]]
+            remaining = end - total
+            while remaining > 0:
+                parts.append(data[:min(remaining, total) * FRAME_BYTES])
+                remaining -= total
+            chunk = b"".join(parts)
+        else:
+            chunk = data[start * FRAME_BYTES:]
+            # Output frames the remaining source still covers; the rest of
+            # this chunk is silence, as on the same-rate path.
+            available = min(frames, math.ceil((total - self.position) / self.step))
+        if not len(chunk):
+            self.finished = True
+            return None
+        if self.step != 1:
+            samples = array("h")
+            samples.frombytes(chunk)
+            out = self._resample(samples, available).tobytes()
+        else:
+            out = bytes(chunk)
+        self.position += frames * self.step
+        if self.loop:
+            self.position %= total
+        if len(out) < frames * FRAME_BYTES:
+            out += bytes(frames * FRAME_BYTES - len(out))
+            self.finished = True
+        return out
+
+    def _resample(self, samples, frames):
+        # Nearest-neighbour; ringtones do not need better.
+        count = len(samples) // CHANNELS
+        offset = self.position - int(self.position)
+        out = array("h")
+        for i in range(frames):
+            j = min(int(offset + i * self.step), count - 1)
+            out.extend(samples[j * CHANNELS:(j + 1) * CHANNELS])
+        return out
+
+    def close(self):
+        self.finished = True
+
+def mix(chunks):
+    if len(chunks) == 1:
+        return chunks[0]
+    total = array("h", chunks[0])
+    for chunk in chunks[1:]:
+        total = list(map(operator.add, total, array("h", chunk)))
+    if max(total) > 32767 or min(total) < -32768:
+        total = list(map(max, map(min, total, repeat(32767)), repeat(-32768)))
+    return array("h", total).tobytes()
+
+class Mixer:
+    # One thread per burst of playback: it pulls a chunk from every active
+    # source, mixes them and writes the result to a fresh sink, staying at
+    # most LEAD seconds ahead of real time so stops take effect quickly.
+    # The thread and its sink go away when the last source ends.
+    LEAD = 0.25
+
+    def __init__(self, open_sink, chunk_frames=CHUNK_FRAMES):
+        self.open_sink = open_sink
+        self.chunk_frames = chunk_frames
+        self.sources = {}
+        self.chunks_mixed = 0
+        self._lock = Lock()
+        self._running = False
+        self._aborted = False
+
+    def add(self, key, source):
+        with self._lock:
+            old = self.sources.pop(key, None)
+            self.sources[key] = source
+            self._aborted = False
+            if not self._running:
+                self._running = True
+                Thread(target=self._run, daemon=True).start()
+        if old is not None:
+            old.close()
+
+    def remove(self, key=None):
+        with self._lock:
+            if key is None:
+                removed = list(self.sources.values())
+                self.sources.clear()
+            else:
+                removed = [self.sources.pop(key)] if key in self.sources else []
+            if removed and not self.sources:
+                self._aborted = True
+        for source in removed:
+            source.close()
+
+    def active(self):
+        with self._lock:
+            return list(self.sources)
+
+    def _run(self):
+        sink = self.open_sink()
+        started = time.monotonic()
+        written = 0
+        try:
+            while True:
+                with self._lock:
+                    sources = list(self.sources.items())
+                    if not sources:
+                        self._running = False
+                        aborted = self._aborted
+                        break
+                chunks = []
+                for key, source in sources:
+                    data = source.read(self.chunk_frames)
+                    if data is not None:
+                        chunks.append(data)
+                    if source.finished:
+                        with self._lock:
+                            if self.sources.get(key) is source:
+                                del self.sources[key]
+                if chunks:
+                    sink.write(mix(chunks))
+                    self.chunks_mixed += 1
+                written += self.chunk_frames
+                ahead = started + written / RATE - time.monotonic() - self.LEAD
+                if ahead > 0:
+                    time.sleep(ahead)
+        except Exception:
+            with self._lock:
+                self._running = False
+            aborted = True
+            raise
+        finally:
+            sink.close(aborted)
+
+class NullSink:
+    def __init__(self):
+        self.bytes_written = 0
+
+    def write(self, data):
+        self.bytes_written += len(data)
+
+    def close(self, abort=False):
+        pass
+
+class FileSink:
+    def __init__(self, path):
+        self.out = wave.open(path, "wb")
+        self.out.setnchannels(CHANNELS)
+        self.out.setsampwidth(SAMPLE_WIDTH)
+        self.out.setframerate(RATE)
+
+    def write(self, data):
+        self.out.writeframes(data)
+
+    def close(self, abort=False):
+        self.out.close()
+
+class PipeSink:
+    # Streams raw PCM into aplay (ALSA) or paplay (PulseAudio/PipeWire).
+    COMMANDS = {
+        "aplay": ["aplay", "-q", "-t", "raw", "-f", "S16_LE", "-c", str(CHANNELS), "-r", str(RATE), "-"],
+        "paplay": ["paplay", "--raw", "--format=s16le", f"--channels={CHANNELS}", f"--rate={RATE}"],
+    }
+
+    def __init__(self, player):
+        self.proc = subprocess.Popen(self.COMMANDS[player], stdin=subprocess.PIPE,
+                                     stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    @staticmethod
+    def available():
+        for player in ("aplay", "paplay"):
+            if shutil.which(player):
+                return lambda: PipeSink(player)
+        return None
+
+    def write(self, data):
+        try:
+            self.proc.stdin.write(data)
+        except (BrokenPipeError, ValueError, OSError):
+            pass
+
+    def close(self, abort=False):
+        if abort:
+            self.proc.kill()
+        else:
+            try:
+                self.proc.stdin.close()
+            except OSError:
+                pass
+        self.proc.wait()
+
+class WinsoundPlayer:
+    # winsound plays one file at a time and cannot be fed audio, so on
+    # Windows the newest sound replaces the current one instead of mixing.
+    def __init__(self):
+        import winsound
+        self.winsound = winsound
+        self.playing = None
+
+    def play(self, key, path, loop):
+        flags = self.winsound.SND_ASYNC | self.winsound.SND_FILENAME
+        if loop:
+            flags |= self.winsound.SND_LOOP
+        self.playing = key
+        self.winsound.PlaySound(path, flags)
+
+    def stop(self, key=None):
+        if key is None or key == self.playing:
+            self.playing = None
+            self.winsound.PlaySound(None, self.winsound.SND_PURGE)
+
+class AudioEngine:
+    # Sounds are identified by key: playing a key again replaces that sound,
+    # and stop(key) leaves every other sound playing.
+    def __init__(self, output):
+        self.cache = PcmCache()
+        if isinstance(output, WinsoundPlayer):
+            self.player = output
+            self.mixer = None
+        else:
+            self.player = None
+            self.mixer = Mixer(output)
+
+    def play(self, path, loop=False, key="default"):
+        try:
+            if self.player is not None:
+                os.stat(path)
+                self.player.play(key, path, loop)
+            else:
+                self.mixer.add(key, WavSource(self.cache.get(path), loop))
+        except (OSError, EOFError, ValueError, wave.Error) as e:
+            print(f"Cannot play {path}: {e}")
+            return False
+        return True
+
+    def stop(self, key=None):
+        if self.player is not None:
+            self.player.stop(key)
+        else:
+            self.mixer.remove(key)
+
+def default_output():
+    choice = os.environ.get("ALARM_AUDIO", "")
+    if choice == "null":
+        return NullSink
+    if choice.startswith("file:"):
+        return lambda: FileSink(choice[len("file:"):])
+    if sys.platform == "win32":
+        return WinsoundPlayer()
+    return PipeSink.available() or NullSink
+
+_engine = None
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        _engine = AudioEngine(default_output())
+    return _engine
@@ -0,0 +1,311 @@
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+import statistics
+import subprocess
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import dial
+from alarm_core import AlarmEngine, AlarmScheduler, AlarmStore, zone_offsets
+
+# Benchmarks for the hot paths: scheduling, the alarm list, dial hands,
+# world clock ticks and startup. With a display (a real one or Xvfb, e.g.
+# `xvfb-run python bench.py`) the Tk cases drive a real AlarmApp; without
+# one, or with --stub, they call the same methods against stub widgets, so
+# they time the Python work but not Tk's. Results are printed, and written
+# as JSON with -o; --compare prints the change against an earlier JSON run.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+class StubWidget:
+    # Accepts the widget and canvas calls the timed methods make and only
+    # counts them.
+    def __init__(self):
+        self.calls = 0
+
+    def _call(self, *args, **kwargs):
+        self.calls += 1
+
+    config = configure = coords = itemconfigure = _call
+
+def timed(func, repeat=5, number=1):
+    # Milliseconds per call: median and best of `repeat` runs of `number`.
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        runs.append((time.perf_counter() - started) * 1000 / number)
+    return {"median_ms": round(statistics.median(runs), 4), "best_ms": round(min(runs), 4)}
+
+def rate(func, seconds=1.0):
+    count = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            func()
+        count += 100
+    return round(count / (time.perf_counter() - started))
+
+def bench_schedule(count, workdir):
+    # AlarmEngine.add_many into a fresh store, a cold load of the same
+    # store, the scheduler firing every alarm at once, and completing them
+    # (the run_alarms path once the user has dismissed them).
+    path = os.path.join(workdir, "schedule.db")
+    base = datetime.now().replace(microsecond=0) + timedelta(days=1)
+    items = [(base + timedelta(seconds=i), f"Alarm {i}") for i in range(count)]
+    engine = AlarmEngine(AlarmStore(path), lambda ids: None)
+    started = time.perf_counter()
+    ids = engine.add_many(items)
+    added = time.perf_counter() - started
+    engine.close()
+
+    engine = AlarmEngine(AlarmStore(path), lambda ids: None)
+    started = time.perf_counter()
+    engine.load()
+    loaded = time.perf_counter() - started
+
+    started = time.perf_counter()
+    moved, deleted = engine.complete_many(ids, now=base + timedelta(seconds=count))
+    completed = time.perf_counter() - started
+    engine.close()
+
+    fired = []
+    done = SimpleNamespace(at=None, groups=0)
+
+    def on_fire(group):
+        fired.extend(group)
+        done.groups += 1
+        if len(fired) >= count:
+            done.at = time.perf_counter()
+
+    scheduler = AlarmScheduler(on_fire)
+    now = time.time()
+    started = time.perf_counter()
+    scheduler.schedule_many((i, now - 1 + i / count) for i in range(count))
+    while done.at is None and time.perf_counter() - started < 30:
+        time.sleep(0.001)
+    scheduler.stop()
+    return {
+        "alarms": count,
+        "add_many_ms": round(added * 1000, 2),
+        "load_ms": round(loaded * 1000, 2),
+        "complete_many_ms": round(completed * 1000, 2),
+        "fire_all_ms": round(((done.at or time.perf_counter()) - started) * 1000, 2),
+        "fired": len(fired),
+        "fire_groups": done.groups,
+    }
+
+def bench_dial_stub():
+    import sans
+    canvas = StubWidget()
+    clock = SimpleNamespace(clock_canvas=canvas, hour_hand=1, minute_hand=2, second_hand=3)
+    stopwatch = SimpleNamespace(elapsed=0.0, shown_text=None, shown_hands=(None, None), time_label=StubWidget(),
+                                canvas=canvas, minute_hand=1, second_hand=2)
+
+    def stopwatch_frame():
+        stopwatch.elapsed += 0.016
+        sans.StopwatchPage.update_display(stopwatch)
+
+    return {
+        "clock_hand_lookups_per_s": rate(lambda: dial.clock_hands(10, 42, 17)),
+        "clock_updates_per_s": rate(lambda: sans.AlarmApp.draw_clock_hands(clock)),
+        "stopwatch_updates_per_s": rate(stopwatch_frame),
+    }
+
+def bench_world_clock_stub(zones):
+    import sans
+    page = SimpleNamespace(app=SimpleNamespace(zone_offsets=zone_offsets),
+                           cities=[(zone, zone) for zone in zones],
+                           clock_labels={zone: StubWidget() for zone in zones})
+    sans.WorldClockPage.update_world_clocks(page)
+    return {"zones": len(zones), "tick": timed(lambda: sans.WorldClockPage.update_world_clocks(page), number=20)}
+
+def bench_alarm_list_stub(count):
+    # update_alarm_list's bookkeeping only; rows need real widgets.
+    import sans
+    app = SimpleNamespace(alarm_rows={}, row_pool=[], alarm_order=[], refresh_alarm_list=lambda: None,
+                          alarms={i: None for i in range(count)})
+    return {"alarms": count, "rebuild": timed(lambda: sans.AlarmApp.update_alarm_list(app))}
+
+def bench_startup_import():
+    runs = []
+    for _ in range(3):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "import sans"], cwd=HERE, check=True)
+        runs.append((time.perf_counter() - started) * 1000)
+    return {"import_ms": round(statistics.median(runs), 1)}
+
+def tk_app():
+    import tkinter as tk
+    import sans
+    root = tk.Tk()
+    app = sans.AlarmApp(root)
+    root.update()
+    return root, app
+
+def settle(root, app):
+    app.dispatcher.flush()
+    root.update_idletasks()
+
+def bench_startup_tk():
+    # Whole process: interpreter, imports, building the window and the
+    # first paint with the alarm list loaded.
+    child = "import tkinter as tk, sans; root = tk.Tk(); sans.AlarmApp(root); root.update(); root.destroy()"
+    runs = []
+    for _ in range(3):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", child], cwd=HERE, check=True)
+        runs.append((time.perf_counter() - started) * 1000)
+    return {"process_to_first_paint_ms": round(statistics.median(runs), 1)}
+
+def bench_alarm_list_tk(root, app, count):
+    base = datetime.now().replace(microsecond=0) + timedelta(days=1)
+    ids = app.add_alarms([(base + timedelta(seconds=i), f"Alarm {i}") for i in range(count)])
+    settle(root, app)
+
+    def rebuild():
+        app.update_alarm_list()
+        settle(root, app)
+
+    state = SimpleNamespace(step=0)
+
+    def add_one():
+        state.step += 1
+        app.add_alarms([(base + timedelta(days=1, seconds=state.step), "Extra")])
+        settle(root, app)
+
+    def delete_one():
+        app.delete_alarms([app.alarm_order[-1]])
+        settle(root, app)
+
+    def scroll():
+        app.scroll_alarm_list("scroll", 1, "pages")
+        root.update_idletasks()
+
+    results = {"alarms": len(ids), "rebuild": timed(rebuild), "add_one": timed(add_one, number=20),
+               "delete_one": timed(delete_one, number=20), "scroll_page": timed(scroll, number=20)}
+    app.delete_alarms(ids)
+    settle(root, app)
+    return results
+
+def bench_dial_tk(root, app):
+    import sans
+    page = app.show_page(sans.StopwatchPage)
+    root.update()
+    page.start_time = time.perf_counter()
+
+    def clock_frame():
+        app.update_clock()
+        root.update_idletasks()
+
+    def stopwatch_frame():
+        page.update_stopwatch()
+        root.update_idletasks()
+
+    results = {"clock_updates_per_s": rate(clock_frame), "stopwatch_updates_per_s": rate(stopwatch_frame)}
+    page.hide()
+    return results
+
+def bench_world_clock_tk(root, app, zones):
+    import sans
+    page = app.show_page(sans.WorldClockPage)
+    for zone in zones:
+        if zone not in page.clock_labels:
+            page.cities.append((zone, zone))
+            page.add_clock_row(zone, zone)
+    root.update()
+
+    def tick():
+        page.update_world_clocks()
+        root.update_idletasks()
+
+    results = {"zones": len(page.cities), "tick": timed(tick, number=20)}
+    page.hide()
+    return results
+
+def has_display():
+    try:
+        import tkinter as tk
+        tk.Tk().destroy()
+        return True
+    except Exception:
+        return False
+
+def run(alarms, zone_count, stub):
+    import pytz
+    zones = sorted(pytz.common_timezones)[:zone_count]
+    workdir = tempfile.mkdtemp(prefix="alarm-bench-")
+    os.environ.update(ALARM_DB=os.path.join(workdir, "app.db"), ALARM_SOCKET="off", ALARM_AUDIO="null",
+                      ALARM_ICON_CACHE=os.path.join(workdir, "icons"))
+    use_tk = not stub and has_display()
+    results = {"schedule": bench_schedule(alarms, workdir)}
+    try:
+        if use_tk:
+            results["startup"] = bench_startup_tk()
+            root, app = tk_app()
+            results["alarm_list"] = bench_alarm_list_tk(root, app, alarms)
+            results["dial"] = bench_dial_tk(root, app)
+            results["world_clock"] = bench_world_clock_tk(root, app, zones)
+            app.engine.close()
+            root.destroy()
+        else:
+            results["startup"] = bench_startup_import()
+            results["alarm_list"] = bench_alarm_list_stub(alarms)
+            results["dial"] = bench_dial_stub()
+            results["world_clock"] = bench_world_clock_stub(zones)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "mode": "tk" if use_tk else "stub",
+        "results": results,
+    }
+
+def flatten(data, prefix=""):
+    for key, value in data.items():
+        if isinstance(value, dict):
+            yield from flatten(value, f"{prefix}{key}.")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield f"{prefix}{key}", value
+
+def compare(old, new):
+    if old.get("mode") != new["mode"]:
+        print(f"note: comparing a {old.get('mode')} run with a {new['mode']} run")
+    before = dict(flatten(old["results"]))
+    for key, value in flatten(new["results"]):
+        if before.get(key):
+            print(f"{key:<40} {before[key]:>12g} -> {value:>12g}  {value / before[key]:6.2f}x")
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Benchmark the alarm app's hot paths")
+    parser.add_argument("-o", "--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="earlier JSON results to compare against")
+    parser.add_argument("--alarms", type=int, default=10000, help="alarms to schedule and list")
+    parser.add_argument("--zones", type=int, default=400, help="world clock zones")
+    parser.add_argument("--stub", action="store_true", help="use stub widgets even if a display is available")
+    args = parser.parse_args(argv)
+
+    data = run(args.alarms, args.zones, args.stub)
+    text = json.dumps(data, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), data)
+    else:
+        print(text)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+import math
+from functools import lru_cache
+
+# Precomputed geometry for the analog faces. Every table is built once per
+# (centre, radius, resolution) and then only indexed, so redrawing a hand is
+# a tuple lookup instead of a cos/sin pair.
+
+def angle(step, steps):
+    return step * 2 * math.pi / steps - math.pi / 2
+
+@lru_cache(maxsize=None)
+def hand_table(cx, cy, length, steps):
+    table = []
+    for i in range(steps):
+        a = angle(i, steps)
+        table.append((cx, cy, cx + length * math.cos(a), cy + length * math.sin(a)))
+    return tuple(table)
+
+@lru_cache(maxsize=None)
+def tick_table(cx, cy, count, inner, outer, major_inner=None, major_every=5):
+    ticks = []
+    for i in range(count):
+        a = angle(i, count)
+        start = major_inner if major_inner is not None and i % major_every == 0 else inner
+        ticks.append((cx + start * math.cos(a), cy + start * math.sin(a),
+                      cx + outer * math.cos(a), cy + outer * math.sin(a)))
+    return tuple(ticks)
+
+def draw_ticks(canvas, ticks, **options):
+    for tick in ticks:
+        canvas.create_line(tick, **options)
+
+# Main clock: hour hand moves per minute, minute hand per second.
+CLOCK_TICKS = tick_table(125, 125, 12, 105, 115)
+CLOCK_HOUR = hand_table(125, 125, 70, 12 * 60)
+CLOCK_MINUTE = hand_table(125, 125, 90, 60 * 60)
+CLOCK_SECOND = hand_table(125, 125, 100, 60)
+
+# Timer face counts down in whole seconds.
+TIMER_TICKS = tick_table(125, 125, 60, 115, 120, major_inner=110)
+TIMER_HOUR = hand_table(125, 125, 60, 12 * 60)
+TIMER_MINUTE = hand_table(125, 125, 90, 60 * 60)
+TIMER_SECOND = hand_table(125, 125, 110, 60)
+
+# Stopwatch sweeps continuously: second hand in centiseconds, minute hand
+# per second.
+STOPWATCH_TICKS = TIMER_TICKS
+STOPWATCH_MINUTE = hand_table(125, 125, 90, 60 * 60)
+STOPWATCH_SECOND = hand_table(125, 125, 110, 60 * 100)
+
+def clock_hands(hour, minute, second):
+    return (CLOCK_HOUR[(hour % 12) * 60 + minute],
+            CLOCK_MINUTE[minute * 60 + second],
+            CLOCK_SECOND[second])
+
+def timer_hands(total_seconds):
+    hours, remainder = divmod(int(total_seconds), 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return (TIMER_HOUR[(hours % 12) * 60 + minutes],
+            TIMER_MINUTE[minutes * 60 + seconds],
+            TIMER_SECOND[seconds])
+
+def stopwatch_hands(total_seconds):
+    centis = int(total_seconds * 100)
+    return (STOPWATCH_MINUTE[(centis // 100) % 3600],
+            STOPWATCH_SECOND[centis % 6000])
+
+if __name__ == "__main__":
+    import timeit
+
+    def trig_clock(hour, minute, second):
+        hour_angle = (hour + minute/60) * math.pi/6 - math.pi/2
+        minute_angle = (minute + second/60) * math.pi/30 - math.pi/2
+        second_angle = second * math.pi/30 - math.pi/2
+        return ((125, 125, 125 + 70 * math.cos(hour_angle), 125 + 70 * math.sin(hour_angle)),
+                (125, 125, 125 + 90 * math.cos(minute_angle), 125 + 90 * math.sin(minute_angle)),
+                (125, 125, 125 + 100 * math.cos(second_angle), 125 + 100 * math.sin(second_angle)))
+
+    def trig_stopwatch(total_seconds):
+        minute_angle = total_seconds / 30 - math.pi / 2
+        second_angle = (total_seconds % 60) * math.pi / 30 - math.pi / 2
+        return ((125, 125, 125 + 90 * math.cos(minute_angle), 125 + 90 * math.sin(minute_angle)),
+                (125, 125, 125 + 110 * math.cos(second_angle), 125 + 110 * math.sin(second_angle)))
+
+    def trig_face():
+        out = []
+        for i in range(60):
+            a = i * math.pi / 30 - math.pi / 2
+            start = 110 if i % 5 == 0 else 115
+            out.append((125 + start * math.cos(a), 125 + start * math.sin(a),
+                        125 + 120 * math.cos(a), 125 + 120 * math.sin(a)))
+        return out
+
+    cases = [
+        ("clock hands (trig)", lambda: trig_clock(10, 42, 17)),
+        ("clock hands (table)", lambda: clock_hands(10, 42, 17)),
+        ("stopwatch hands (trig)", lambda: trig_stopwatch(1234.567)),
+        ("stopwatch hands (table)", lambda: stopwatch_hands(1234.567)),
+        ("60-tick face (trig)", trig_face),
+        # tick_table itself would only time an lru_cache hit; build it
+        # uncached, and separately walk it the way draw_ticks does.
+        ("60-tick face (table build)", lambda: tick_table.__wrapped__(125, 125, 60, 115, 120, major_inner=110)),
+        ("60-tick face (table walk)", lambda: [tick for tick in TIMER_TICKS]),
+    ]
+    number = 100000
+    for name, func in cases:
+        best = min(timeit.repeat(func, number=number, repeat=5))
+        print(f"{name:26s} {best / number * 1e9:8.0f} ns/call")
@@ -1,14 +1,587 @@
+import time
+STARTUP_T0 = time.perf_counter()
+import sys
+if __name__ == "__main__" and "--headless" in sys.argv[1:]:
+    # The daemon needs no GUI, so it starts before tkinter is imported.
+    import alarm_core
+    sys.exit(alarm_core.main())
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-from datetime import datetime, timedelta
-import time
-import winsound
-from threading import Thread
-import pytz
+from datetime import datetime
+import bisect
 import os
 import math
-from PIL import Image, ImageTk
 import random
+import re
+import csv
+import json
+from array import array
+from collections import deque
+import dial
+import audio
+from alarm_core import AlarmEngine, AlarmStore, Recurrence, SnoozePolicy, deferred_call, parse_alarm_time
+import alarm_ipc
+import alarm_io
+
+def canvas_item_count(canvas):
+    return len(canvas.find_all())
+
+class TimezoneIndex:
+    # Built once per process from pytz data. Prefix lookups bisect a sorted
+    # list of (alias, zone) keys; substring and UTC-offset queries scan the
+    # ~600 prepared entries, which stays well inside a keystroke.
+    OFFSET_QUERY = re.compile(r"^(?:utc|gmt)?\s*([+-])(\d{1,2})(?::?(\d{2}))?$")
+
+    def __init__(self, zones, offsets, limit=50):
+        import pytz
+        self.offsets = offsets
+        self.limit = limit
+        self.zones = sorted(zones)
+
+        countries = {}
+        for code, country_zones in pytz.country_timezones.items():
+            for zone in country_zones:
+                countries.setdefault(zone, []).append(pytz.country_names[code].lower())
+
+        self.entries = []
+        keys = []
+        for zone in self.zones:
+            city = zone.rsplit("/", 1)[-1].replace("_", " ").lower()
+            aliases = [zone.lower(), city] + countries.get(zone, [])
+            self.entries.append((zone, "\n".join(aliases)))
+            keys.extend((alias, zone) for alias in aliases)
+        keys.sort()
+        self.keys = keys
+
+    def search(self, query):
+        query = query.strip().lower()
+        if not query:
+            return self.zones
+        match = self.OFFSET_QUERY.match(query)
+        if match:
+            return self.search_offset(*match.groups())
+
+        results = []
+        seen = set()
+        index = bisect.bisect_left(self.keys, (query,))
+        while index < len(self.keys) and len(results) < self.limit:
+            alias, zone = self.keys[index]
+            if not alias.startswith(query):
+                break
+            if zone not in seen:
+                seen.add(zone)
+                results.append(zone)
+            index += 1
+        for zone, text in self.entries:
+            if len(results) >= self.limit:
+                break
+            if zone not in seen and query in text:
+                seen.add(zone)
+                results.append(zone)
+        return results
+
+    def search_offset(self, sign, hours, minutes):
+        now = time.time()
+        hours = int(hours)
+        results = []
+        for zone in self.zones:
+            offset = self.offsets.offset(zone, now)
+            if (offset < 0) != (sign == "-") and offset != 0:
+                continue
+            zone_hours, zone_minutes = divmod(abs(offset) // 60, 60)
+            if zone_hours == hours and (minutes is None or zone_minutes == int(minutes)):
+                results.append(zone)
+                if len(results) >= self.limit:
+                    break
+        return results
+
+    @staticmethod
+    def format_offset(offset):
+        sign = "-" if offset < 0 else "+"
+        hours, minutes = divmod(abs(offset) // 60, 60)
+        return f"UTC{sign}{hours:02d}:{minutes:02d}"
+
+class CountdownTimer:
+    def __init__(self, name, seconds, on_finish=None):
+        self.name = name
+        self.duration = seconds
+        self.on_finish = on_finish
+        self.deadline = None
+        self.paused_remaining = seconds
+
+    @property
+    def running(self):
+        return self.deadline is not None
+
+    def remaining(self, now=None):
+        if self.deadline is None:
+            return self.paused_remaining
+        if now is None:
+            now = time.monotonic()
+        return max(self.deadline - now, 0)
+
+class TimerManager:
+    # Every countdown shares one after() chain on the root window, which
+    # only wakes for the next finish. Deadlines are absolute time.monotonic()
+    # values, so a late wake-up never adds drift. Display ticks come from
+    # the render governor, not from here.
+    def __init__(self, master):
+        self.master = master
+        self.timers = {}
+        self._after_id = None
+
+    def add(self, name, seconds, on_finish=None):
+        self.remove(name)
+        timer = CountdownTimer(name, seconds, on_finish)
+        self.timers[name] = timer
+        return timer
+
+    def get(self, name):
+        return self.timers.get(name)
+
+    def start(self, name):
+        timer = self.timers[name]
+        if not timer.running and timer.paused_remaining > 0:
+            timer.deadline = time.monotonic() + timer.paused_remaining
+            self._schedule()
+
+    def pause(self, name):
+        timer = self.timers[name]
+        if timer.running:
+            timer.paused_remaining = timer.remaining()
+            timer.deadline = None
+            self._schedule()
+
+    def remove(self, name):
+        if self.timers.pop(name, None) is not None:
+            self._schedule()
+
+    def _schedule(self):
+        if self._after_id is not None:
+            self.master.after_cancel(self._after_id)
+            self._after_id = None
+        now = time.monotonic()
+        delays = [t.remaining(now) for t in self.timers.values() if t.running]
+        if delays:
+            self._after_id = self.master.after(int(min(delays) * 1000) + 1, self._tick)
+
+    def _tick(self):
+        self._after_id = None
+        now = time.monotonic()
+        for timer in list(self.timers.values()):
+            if timer.running and timer.remaining(now) <= 0:
+                timer.deadline = None
+                timer.paused_remaining = 0
+                if timer.on_finish:
+                    timer.on_finish(timer)
+        self._schedule()
+
+class TickStats:
+    # Per-callback histograms of how late each after() callback fired and
+    # how long it ran. Buckets double from 1 ms up to OVERFLOW, so memory
+    # stays fixed however long the app runs. When disabled, callers skip
+    # record() entirely and pay only the enabled check.
+    BOUNDS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+    DUMP_MS = 10000
+
+    def __init__(self, enabled=False, dump_path=None):
+        self.enabled = enabled or bool(dump_path)
+        self.dump_path = dump_path
+        self.callbacks = {}
+
+    def record(self, name, late, ran):
+        entry = self.callbacks.get(name)
+        if entry is None:
+            size = len(self.BOUNDS) + 1
+            entry = self.callbacks[name] = (array("L", [0]) * size, array("L", [0]) * size, [0.0, 0.0])
+        late *= 1000
+        ran *= 1000
+        entry[0][bisect.bisect_left(self.BOUNDS, late)] += 1
+        entry[1][bisect.bisect_left(self.BOUNDS, ran)] += 1
+        maxima = entry[2]
+        if late > maxima[0]:
+            maxima[0] = late
+        if ran > maxima[1]:
+            maxima[1] = ran
+
+    def reset(self):
+        self.callbacks.clear()
+
+    def percentile(self, buckets, fraction):
+        # Upper bound of the bucket holding that fraction of the samples;
+        # None for the overflow bucket.
+        target = sum(buckets) * fraction
+        seen = 0
+        for bound, count in zip(self.BOUNDS + (None,), buckets):
+            seen += count
+            if count and seen >= target:
+                return bound
+        return 0
+
+    def summary(self):
+        return {name: {"count": sum(late),
+                       "late_ms": {"p50": self.percentile(late, 0.5), "p99": self.percentile(late, 0.99),
+                                   "max": round(maxima[0], 2), "buckets": list(late)},
+                       "run_ms": {"p50": self.percentile(run, 0.5), "p99": self.percentile(run, 0.99),
+                                  "max": round(maxima[1], 2), "buckets": list(run)}}
+                for name, (late, run, maxima) in self.callbacks.items()}
+
+    def report(self):
+        def bucket(bound):
+            return f"<={bound}" if bound is not None else f">{self.BOUNDS[-1]}"
+
+        lines = [f"{'callback':<20} {'n':>6}  late p50 p99 max   run p50 p99 max"]
+        for name, stats in self.summary().items():
+            late, run = stats["late_ms"], stats["run_ms"]
+            lines.append(f"{name:<20} {stats['count']:>6}  {bucket(late['p50']):>5} {bucket(late['p99']):>5} "
+                         f"{late['max']:>6.1f}  {bucket(run['p50']):>5} {bucket(run['p99']):>5} {run['max']:>6.1f}")
+        return "\n".join(lines)
+
+    def dump(self):
+        data = {"time": time.time(), "bounds_ms": list(self.BOUNDS), "callbacks": self.summary()}
+        temp = self.dump_path + ".tmp"
+        with open(temp, "w") as f:
+            json.dump(data, f, indent=1)
+        os.replace(temp, self.dump_path)
+
+    def start_dumps(self, master):
+        # Rewrites dump_path every DUMP_MS while recording is on.
+        if self.dump_path is None:
+            return
+        if self.enabled:
+            try:
+                self.dump()
+            except OSError as e:
+                print(f"Cannot write tick stats to {self.dump_path}: {e}")
+        master.after(self.DUMP_MS, self.start_dumps, master)
+
+class RenderSurface:
+    # One animated widget. While it is active it redraws every `period` ms
+    # (or after next_delay() ms), but only while its toplevel is mapped and
+    # the widget is not fully obscured; a hidden surface has no after()
+    # callback pending at all and is redrawn once when it shows again.
+    def __init__(self, name, widget, draw, period, next_delay=None, stats=None):
+        self.name = name
+        self.widget = widget
+        self.draw = draw
+        self.callback_name = getattr(draw, "__name__", name)
+        self.stats = stats or TickStats()
+        self.due = None
+        self.period = period
+        self.next_delay = next_delay or (lambda: period)
+        self.active = False
+        self.mapped = True
+        self.obscured = False
+        self.after_id = None
+        self.hidden_since = None
+        self.rendered = 0
+        self.skipped = 0
+        self.toplevel = widget.winfo_toplevel()
+        self.toplevel.bind("<Map>", self.on_map, add="+")
+        self.toplevel.bind("<Unmap>", self.on_unmap, add="+")
+        widget.bind("<Visibility>", self.on_visibility, add="+")
+
+    @property
+    def visible(self):
+        return self.mapped and not self.obscured
+
+    def start(self):
+        self.active = True
+        if self.after_id is None:
+            self.frame()
+
+    def stop(self):
+        self.active = False
+        self.cancel()
+        self.hidden_since = None
+
+    def cancel(self):
+        self.due = None
+        if self.after_id is not None:
+            self.widget.after_cancel(self.after_id)
+            self.after_id = None
+
+    def redraw(self):
+        self.draw()
+        self.rendered += 1
+
+    def frame(self):
+        self.after_id = None
+        if not self.active:
+            return
+        if not self.visible:
+            if self.hidden_since is None:
+                self.hidden_since = time.monotonic()
+            return
+        if self.stats.enabled:
+            self.timed_redraw()
+        else:
+            self.redraw()
+        delay = max(int(self.next_delay()), 1)
+        if self.stats.enabled:
+            self.due = time.perf_counter() + delay / 1000
+        self.after_id = self.widget.after(delay, self.frame)
+
+    def timed_redraw(self):
+        # Only frames that came from after() have a deadline to be late
+        # for; the first frame after start() or a show is not recorded.
+        started = time.perf_counter()
+        self.redraw()
+        if self.due is not None:
+            self.stats.record(self.callback_name, max(started - self.due, 0), time.perf_counter() - started)
+        self.due = None
+
+    def set_visibility(self, mapped=None, obscured=None):
+        was_visible = self.visible
+        if mapped is not None:
+            self.mapped = mapped
+        if obscured is not None:
+            self.obscured = obscured
+        if was_visible and not self.visible:
+            self.cancel()
+            if self.active:
+                self.hidden_since = time.monotonic()
+        elif self.visible and not was_visible and self.active:
+            if self.hidden_since is not None:
+                self.skipped += int((time.monotonic() - self.hidden_since) * 1000 / self.period)
+                self.hidden_since = None
+            self.cancel()
+            self.frame()
+
+    def on_map(self, event):
+        if event.widget is self.toplevel:
+            self.set_visibility(mapped=True)
+
+    def on_unmap(self, event):
+        if event.widget is self.toplevel:
+            self.set_visibility(mapped=False)
+
+    def on_visibility(self, event):
+        if event.widget is self.widget:
+            self.set_visibility(obscured=event.state == "VisibilityFullyObscured")
+
+class RenderGovernor:
+    # Every animated surface (main dial, stopwatch, timer, world clocks)
+    # registers here, so visibility handling and frame accounting live in
+    # one place.
+    def __init__(self, tick_stats=None):
+        self.surfaces = {}
+        self.tick_stats = tick_stats or TickStats()
+
+    def register(self, name, widget, draw, period, next_delay=None):
+        surface = RenderSurface(name, widget, draw, period, next_delay, self.tick_stats)
+        self.surfaces[name] = surface
+        widget.bind("<Destroy>", lambda e: self.unregister(surface) if e.widget is widget else None, add="+")
+        return surface
+
+    def unregister(self, surface):
+        surface.stop()
+        if self.surfaces.get(surface.name) is surface:
+            del self.surfaces[surface.name]
+
+    @staticmethod
+    def until_next_second():
+        return 1000 - int(time.time() * 1000) % 1000
+
+    def stats(self):
+        return {name: {"rendered": s.rendered, "skipped": s.skipped, "visible": s.visible, "active": s.active}
+                for name, s in self.surfaces.items()}
+
+class ThemeEngine:
+    # Widgets and canvas items sign up for a named style role. Switching
+    # themes reconfigures exactly those widgets and issues one itemconfigure
+    # per role tag on each registered canvas, so nothing is rebuilt.
+    WIDGET_ROLES = {
+        "surface": {"bg": "bg"},
+        "text": {"fg": "fg", "bg": "bg"},
+        "button": {"fg": "fg", "bg": "button_bg"},
+        "accent_button": {"fg": "fg"},
+        "panel": {"bg": "button_bg"},
+        "panel_text": {"fg": "fg", "bg": "button_bg"},
+        "entry": {"fg": "fg", "bg": "button_bg", "insertbackground": "fg"},
+        "dial": {"bg": "clock_bg"},
+    }
+    ITEM_ROLES = {
+        "theme.face": {"outline": "clock_fg"},
+        "theme.tick": {"fill": "clock_fg"},
+        "theme.hand": {"fill": "clock_hands"},
+        "theme.second_hand": {"fill": "clock_second_hand"},
+        "theme.bar": {"fill": "button_bg"},
+    }
+
+    def __init__(self, themes, current):
+        self.themes = themes
+        self.current = current
+        self.widgets = {}
+        self.canvases = {}
+
+    @property
+    def colors(self):
+        return self.themes[self.current]
+
+    def options(self, role):
+        colors = self.colors
+        return {option: colors[key] for option, key in self.WIDGET_ROLES[role].items()}
+
+    def item(self, tag):
+        colors = self.colors
+        return {option: colors[key] for option, key in self.ITEM_ROLES[tag].items()}
+
+    def register(self, widget, role):
+        widget.configure(**self.options(role))
+        self.widgets[widget] = role
+        widget.bind("<Destroy>", lambda e, w=widget: self.forget(w) if e.widget is w else None, add="+")
+        return widget
+
+    def register_canvas(self, canvas, role="dial"):
+        self.canvases[canvas] = None
+        return self.register(canvas, role)
+
+    def forget(self, widget):
+        self.widgets.pop(widget, None)
+        self.canvases.pop(widget, None)
+
+    def apply(self, theme_name):
+        self.current = theme_name
+        options = {role: self.options(role) for role in self.WIDGET_ROLES}
+        items = {tag: self.item(tag) for tag in self.ITEM_ROLES}
+        for widget, role in list(self.widgets.items()):
+            try:
+                widget.configure(**options[role])
+            except tk.TclError:
+                self.forget(widget)
+        for canvas in list(self.canvases):
+            try:
+                for tag, item_options in items.items():
+                    canvas.itemconfigure(tag, **item_options)
+            except tk.TclError:
+                self.forget(canvas)
+
+class StartupTimer:
+    def __init__(self, enabled, started):
+        self.enabled = enabled
+        self.started = started
+        self.last = started
+        self.phases = []
+
+    def mark(self, phase):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+
+    def report(self):
+        if not self.enabled:
+            return
+        for phase, seconds in self.phases:
+            print(f"startup {phase:<12s} {seconds * 1000:8.1f} ms")
+        print(f"startup {'total':<12s} {(self.last - self.started) * 1000:8.1f} ms")
+
+def cached_icon(path, size, cache_dir):
+    # Resized icons are kept as PNGs that Tk can load without PIL; a cached
+    # copy is reused while it is newer than its source.
+    name, _ = os.path.splitext(os.path.basename(path))
+    cached = os.path.join(cache_dir, f"{name}-{size[0]}x{size[1]}.png")
+    try:
+        if os.path.getmtime(cached) >= os.path.getmtime(path):
+            return tk.PhotoImage(file=cached)
+    except (OSError, tk.TclError):
+        # Missing, stale or unreadable copies are rebuilt.
+        pass
+    from PIL import Image
+    image = Image.open(path).resize(size)
+    # Written aside and renamed into place, so an interrupted save never
+    # leaves a truncated PNG that looks newer than its source.
+    temp = f"{cached}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        image.save(temp, "PNG")
+        os.replace(temp, cached)
+        return tk.PhotoImage(file=cached)
+    except (OSError, tk.TclError):
+        try:
+            os.remove(temp)
+        except OSError:
+            pass
+        from PIL import ImageTk
+        return ImageTk.PhotoImage(image)
+
+class UiDispatcher:
+    # Worker threads (scheduler, control socket) never touch Tk. They post
+    # (kind, payload) events onto a deque and the Tk loop drains it on a
+    # short after() poll. Each kind's handler gets every payload posted since
+    # the last drain in one call, and refreshes requested with mark_dirty run
+    # once per burst no matter how many events asked for them.
+    POLL_MS = 50
+
+    def __init__(self, master):
+        self.master = master
+        self.events = deque()
+        self.handlers = {}
+        self.dirty = {}
+        self.flush_id = None
+        self.drains = 0
+        self.handled = 0
+        self.max_depth = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self.master.after(self.POLL_MS, self.drain)
+
+    def register(self, kind, handler):
+        self.handlers[kind] = handler
+
+    def post(self, kind, payload=None):
+        # Safe from any thread: deque.append is atomic.
+        self.events.append((time.monotonic(), kind, payload))
+
+    def mark_dirty(self, callback):
+        # Main thread only.
+        self.dirty[callback] = None
+        if self.flush_id is None:
+            self.flush_id = self.master.after_idle(self.flush)
+
+    def flush(self):
+        self.flush_id = None
+        dirty, self.dirty = self.dirty, {}
+        for callback in dirty:
+            callback()
+
+    def drain(self):
+        self.master.after(self.POLL_MS, self.drain)
+        depth = len(self.events)
+        if not depth:
+            return
+        self.max_depth = max(self.max_depth, depth)
+        batches = {}
+        oldest = None
+        for _ in range(depth):
+            posted, kind, payload = self.events.popleft()
+            if oldest is None:
+                oldest = posted
+            batches.setdefault(kind, []).append(payload)
+        self.last_latency = time.monotonic() - oldest
+        self.max_latency = max(self.max_latency, self.last_latency)
+        self.drains += 1
+        self.handled += depth
+        for kind, payloads in batches.items():
+            try:
+                self.handlers[kind](payloads)
+            except Exception as e:
+                print(f"UI event {kind!r} failed: {e!r}")
+        if self.flush_id is not None:
+            self.master.after_cancel(self.flush_id)
+            self.flush()
+
+    def stats(self):
+        return {
+            "depth": len(self.events),
+            "max_depth": self.max_depth,
+            "drains": self.drains,
+            "events": self.handled,
+            "last_latency_ms": round(self.last_latency * 1000, 2),
+            "max_latency_ms": round(self.max_latency * 1000, 2),
+        }
 
 class AlarmApp:
     def __init__(self, master):
@@ -18,7 +591,28 @@ class AlarmApp:
         self.master.resizable(False, False)
 
         self.alarm_sound = "default_alarm.wav"
-        self.alarms = []
+        self.dispatcher = UiDispatcher(self.master)
+        self.dispatcher.register("alarm_due", self.run_alarms)
+        self.dispatcher.register("call", self.run_calls)
+        self.engine = AlarmEngine(AlarmStore(os.environ.get("ALARM_DB", "alarms.db")), self.on_alarm_due)
+        self.alarms = self.engine.alarms
+        self.ringing = []
+        self.challenge = None
+        self.alarm_sounds = []
+        self.pages = {}
+        self.tick_stats = TickStats(bool(os.environ.get("ALARM_TICK_STATS")), os.environ.get("ALARM_TICK_STATS_FILE"))
+        self.governor = RenderGovernor(self.tick_stats)
+        self.timers = TimerManager(self.master)
+        self.zone_offsets = self.engine.offsets
+        self.world_cities = [
+            ("New York", "America/New_York"),
+            ("London", "Europe/London"),
+            ("Tokyo", "Asia/Tokyo"),
+            ("Sydney", "Australia/Sydney"),
+            ("Moscow", "Europe/Moscow")
+        ]
+        self.timezone_index = None
+        self.audio = audio.get_engine()
         self.ringtones = ["default_alarm.wav", "surfing.wav", "megalovania.wav", "metal_pipe.wav"]
         
         self.themes = {
@@ -57,16 +651,36 @@ class AlarmApp:
         }
         
         self.current_theme = "Default"
+        self.theme = ThemeEngine(self.themes, self.current_theme)
         
+        self.startup = StartupTimer(bool(os.environ.get("ALARM_STARTUP_TIMING")), STARTUP_T0)
+        self.startup.mark("imports")
         self.load_images()
+        self.startup.mark("load_images")
         self.setup_ui()
-        
+        self.startup.mark("setup_ui")
+        self.master.after_idle(self.on_first_paint)
+        self.tick_stats.start_dumps(self.master)
+        self.control = alarm_ipc.start_server(self.call_in_ui, {
+            "add": self.add_alarms,
+            "delete": self.delete_alarm,
+            "snooze": self.snooze_alarm,
+            "list": self.engine.iter_alarms,
+        })
+        
+    def on_first_paint(self):
+        self.startup.mark("first_paint")
+        self.load_alarms()
+        self.startup.mark("load_alarms")
+        self.startup.report()
+
     def load_images(self):
         button_size = (50, 50)
-        self.img_settings = ImageTk.PhotoImage(Image.open("settings_icon.png").resize(button_size))
-        self.img_world = ImageTk.PhotoImage(Image.open("world_icon.png").resize(button_size))
-        self.img_stopwatch = ImageTk.PhotoImage(Image.open("stopwatch_icon.png").resize(button_size))
-        self.img_timer = ImageTk.PhotoImage(Image.open("timer_icon.png").resize(button_size))
+        cache_dir = os.environ.get("ALARM_ICON_CACHE", ".icon_cache")
+        self.img_settings = cached_icon("settings_icon.png", button_size, cache_dir)
+        self.img_world = cached_icon("world_icon.png", button_size, cache_dir)
+        self.img_stopwatch = cached_icon("stopwatch_icon.png", button_size, cache_dir)
+        self.img_timer = cached_icon("timer_icon.png", button_size, cache_dir)
         
     def setup_ui(self):
         self.create_canvas()
@@ -76,9 +690,9 @@ class AlarmApp:
         self.create_alarm_list()
         
     def create_canvas(self):
-        self.canvas = tk.Canvas(self.master, width=500, height=700, bg=self.themes[self.current_theme]["bg"])
+        self.canvas = self.theme.register_canvas(tk.Canvas(self.master, width=500, height=700), "surface")
         self.canvas.place(x=0, y=0)
-        self.canvas.create_rectangle(0, 620, 500, 700, fill=self.themes[self.current_theme]["button_bg"], outline="")
+        self.canvas.create_rectangle(0, 620, 500, 700, outline="", tags="theme.bar", **self.theme.item("theme.bar"))
         
     def create_buttons(self):
         buttons = [
@@ -90,201 +704,388 @@ class AlarmApp:
         
         for text, image, x, y, command in buttons:
             btn = tk.Button(self.master, image=image, text=text, compound=tk.TOP, 
-                            font=("Helvetica", 10, "bold"), fg=self.themes[self.current_theme]["fg"], 
-                            bg=self.themes[self.current_theme]["button_bg"], 
-                            bd=0, command=command)
+                            font=("Helvetica", 10, "bold"), bd=0, command=command)
+            self.theme.register(btn, "button")
             btn.place(x=x, y=y)
         
         add_alarm_btn = tk.Button(self.master, text="+ Add New Alarm", font=("Helvetica", 12, "bold"), 
-                              fg=self.themes[self.current_theme]["fg"], bg="#4CAF50", command=self.open_alarm_page)
+                              bg="#4CAF50", command=self.open_alarm_page)
+        self.theme.register(add_alarm_btn, "accent_button")
         add_alarm_btn.place(relx=0.5, y=340, anchor=tk.CENTER, width=150, height=40)
         
     def create_labels(self):
-        greeting_label = tk.Label(self.master, text='SANS', font=("Consolas", 24, "bold"), 
-                 fg=self.themes[self.current_theme]["fg"], bg=self.themes[self.current_theme]["bg"])
+        greeting_label = self.theme.register(tk.Label(self.master, text='SANS', font=("Consolas", 24, "bold")), "text")
         greeting_label.place(relx=0.5, y=20, anchor=tk.N)
         
-        alarms_label = tk.Label(self.master, text='Your Alarms', font=("Helvetica", 18, "bold"), 
-                 fg=self.themes[self.current_theme]["fg"], bg=self.themes[self.current_theme]["bg"])
+        alarms_label = self.theme.register(tk.Label(self.master, text='Your Alarms', font=("Helvetica", 18, "bold")), "text")
         alarms_label.place(relx=0.5, y=380, anchor=tk.CENTER)
 
     def create_analog_clock(self):
-        self.clock_canvas = tk.Canvas(self.master, width=250, height=250, bg=self.themes[self.current_theme]["clock_bg"], highlightthickness=0)
+        self.clock_canvas = self.theme.register_canvas(tk.Canvas(self.master, width=250, height=250, highlightthickness=0))
         self.clock_canvas.place(relx=0.5, y=185, anchor=tk.CENTER)
         self.draw_clock_face()
-        self.update_clock()
+        self.create_clock_hands()
+        self.clock_surface = self.governor.register("clock", self.clock_canvas, self.update_clock, 1000,
+                                                    RenderGovernor.until_next_second)
+        self.clock_surface.start()
         
     def draw_clock_face(self):
-        self.clock_canvas.create_oval(10, 10, 240, 240, outline=self.themes[self.current_theme]["clock_fg"], width=3)
-        for i in range(12):
-            angle = i * math.pi/6 - math.pi/2
-            x1 = 125 + 105 * math.cos(angle)
-            y1 = 125 + 105 * math.sin(angle)
-            x2 = 125 + 115 * math.cos(angle)
-            y2 = 125 + 115 * math.sin(angle)
-            self.clock_canvas.create_line(x1, y1, x2, y2, fill=self.themes[self.current_theme]["clock_fg"], width=3)
-        
-    def update_clock(self):
-        self.clock_canvas.delete("hands")
+        self.clock_canvas.create_oval(10, 10, 240, 240, width=3, tags="theme.face", **self.theme.item("theme.face"))
+        dial.draw_ticks(self.clock_canvas, dial.CLOCK_TICKS, width=3, tags="theme.tick", **self.theme.item("theme.tick"))
         
-        now = datetime.now()
-        hour = now.hour % 12
-        minute = now.minute
-        second = now.second
-
-        hour_angle = (hour + minute/60) * math.pi/6 - math.pi/2
-        hour_x = 125 + 70 * math.cos(hour_angle)
-        hour_y = 125 + 70 * math.sin(hour_angle)
-        self.clock_canvas.create_line(125, 125, hour_x, hour_y, fill=self.themes[self.current_theme]["clock_hands"], width=6, tags="hands")
+    def create_clock_hands(self):
+        hand = self.theme.item("theme.hand")
+        second_hand = self.theme.item("theme.second_hand")
+        self.hour_hand = self.clock_canvas.create_line(125, 125, 125, 125, width=6, tags=("hands", "theme.hand"), **hand)
+        self.minute_hand = self.clock_canvas.create_line(125, 125, 125, 125, width=4, tags=("hands", "theme.hand"), **hand)
+        self.second_hand = self.clock_canvas.create_line(125, 125, 125, 125, width=2, tags=("hands", "theme.second_hand"), **second_hand)
+        self.clock_canvas.create_oval(120, 120, 130, 130, outline="", tags=("hands", "theme.hand"), **hand)
 
-        minute_angle = (minute + second/60) * math.pi/30 - math.pi/2
-        minute_x = 125 + 90 * math.cos(minute_angle)
-        minute_y = 125 + 90 * math.sin(minute_angle)
-        self.clock_canvas.create_line(125, 125, minute_x, minute_y, fill=self.themes[self.current_theme]["clock_hands"], width=4, tags="hands")
-
-        second_angle = second * math.pi/30 - math.pi/2
-        second_x = 125 + 100 * math.cos(second_angle)
-        second_y = 125 + 100 * math.sin(second_angle)
-        self.clock_canvas.create_line(125, 125, second_x, second_y, fill=self.themes[self.current_theme]["clock_second_hand"], width=2, tags="hands")
-
-        self.clock_canvas.create_oval(120, 120, 130, 130, fill=self.themes[self.current_theme]["clock_hands"], outline="")
+    def update_clock(self):
+        self.draw_clock_hands()
 
-        self.master.after(1000, self.update_clock)
+    def draw_clock_hands(self):
+        now = datetime.now()
+        hour, minute, second = dial.clock_hands(now.hour, now.minute, now.second)
+        self.clock_canvas.coords(self.hour_hand, hour)
+        self.clock_canvas.coords(self.minute_hand, minute)
+        self.clock_canvas.coords(self.second_hand, second)
+
+    def canvas_item_counts(self):
+        return {
+            "main": canvas_item_count(self.canvas),
+            "clock": canvas_item_count(self.clock_canvas),
+            "alarm_list": canvas_item_count(self.alarm_canvas),
+        }
 
     def create_alarm_list(self):
-        self.alarm_frame = tk.Frame(self.master, bg=self.themes[self.current_theme]["bg"])
+        self.alarm_frame = self.theme.register(tk.Frame(self.master), "surface")
         self.alarm_frame.place(relx=0.5, y=510, anchor=tk.CENTER, width=460, height=210)
         
-        self.alarm_canvas = tk.Canvas(self.alarm_frame, bg=self.themes[self.current_theme]["bg"], highlightthickness=0)
+        self.alarm_canvas = self.theme.register(tk.Canvas(self.alarm_frame, highlightthickness=0), "surface")
         self.alarm_canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        
-        self.inner_frame = tk.Frame(self.alarm_canvas, bg=self.themes[self.current_theme]["bg"])
-        self.alarm_canvas.create_window((0, 0), window=self.inner_frame, anchor="nw")
 
-        self.inner_frame.bind("<Configure>", self.on_frame_configure)
+        self.alarm_order = []
+        self.alarm_rows = {}
+        self.row_pool = []
+
+        self.alarm_canvas.bind("<Configure>", self.on_frame_configure)
+        self.bind_alarm_wheel(self.alarm_canvas)
+
+    def bind_alarm_wheel(self, widget):
+        widget.bind("<MouseWheel>", lambda e: self.scroll_alarm_list("scroll", -1 if e.delta > 0 else 1, "units"))
+        widget.bind("<Button-4>", lambda e: self.scroll_alarm_list("scroll", -1, "units"))
+        widget.bind("<Button-5>", lambda e: self.scroll_alarm_list("scroll", 1, "units"))
+
+    def scroll_alarm_list(self, *args):
+        self.alarm_canvas.yview(*args)
+        self.refresh_visible_rows()
 
     def on_frame_configure(self, event):
-        self.alarm_canvas.configure(scrollregion=self.alarm_canvas.bbox("all"))
-        if self.inner_frame.winfo_height() > self.alarm_frame.winfo_height():
+        content_height = len(self.alarm_order) * AlarmRow.HEIGHT
+        self.alarm_canvas.configure(scrollregion=(0, 0, 0, content_height),
+                                    yscrollincrement=AlarmRow.HEIGHT)
+        if content_height > self.alarm_frame.winfo_height():
             if not hasattr(self, 'scrollbar'):
-                self.scrollbar = ttk.Scrollbar(self.alarm_frame, orient=tk.VERTICAL, command=self.alarm_canvas.yview)
+                self.scrollbar = ttk.Scrollbar(self.alarm_frame, orient=tk.VERTICAL, command=self.scroll_alarm_list)
                 self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
                 self.alarm_canvas.configure(yscrollcommand=self.scrollbar.set)
         elif hasattr(self, 'scrollbar'):
             self.scrollbar.pack_forget()
             del self.scrollbar
+            self.alarm_canvas.configure(yscrollcommand="")
+            self.alarm_canvas.yview_moveto(0)
+        self.refresh_visible_rows()
 
     def add_alarm(self, alarm_time, alarm_name):
-        self.alarms.append((alarm_time, alarm_name))
+        return self.add_alarms([(alarm_time, alarm_name)])[0]
+
+    def load_alarms(self):
+        for alarm_id, error in self.engine.load():
+            print(f"Skipping stored alarm {alarm_id}: {error}")
         self.update_alarm_list()
-        Thread(target=self.run_alarm, args=(alarm_time, alarm_name), daemon=True).start()
 
-    def update_alarm_list(self):
-        for widget in self.inner_frame.winfo_children():
-            widget.destroy()
+    def add_alarms(self, items):
+        alarm_ids = self.engine.add_many(items)
+        self.alarm_order.extend(alarm_ids)
+        self.refresh_alarm_list()
+        return alarm_ids
+
+    def import_alarms(self, path):
+        # The reader validates as it streams, so the file lands as one
+        # add_many batch and one list refresh however many rows it has.
+        report = alarm_io.ImportReport(os.path.basename(path))
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            self.engine.add_many(alarm_io.read_alarms(f, report, alarm_io.is_ics(path)))
+        self.update_alarm_list()
+        return report
 
-        for i, (alarm_time, alarm_name) in enumerate(self.alarms):
-            frame = tk.Frame(self.inner_frame, bg=self.themes[self.current_theme]["button_bg"], bd=1, relief=tk.RAISED)
-            frame.pack(fill=tk.X, padx=5, pady=5)
-            
-            name_label = tk.Label(frame, text=alarm_name, font=("Helvetica", 12, "bold"), 
-                                  fg=self.themes[self.current_theme]["fg"], 
-                                  bg=self.themes[self.current_theme]["button_bg"])
-            name_label.pack(side=tk.LEFT, padx=10)
-            
-            time_label = tk.Label(frame, text=alarm_time.strftime("%H:%M"), font=("Helvetica", 12), 
-                                  fg=self.themes[self.current_theme]["fg"], 
-                                  bg=self.themes[self.current_theme]["button_bg"])
-            time_label.pack(side=tk.LEFT, padx=10)
-            
-            delete_btn = tk.Button(frame, text="Delete", command=lambda idx=i: self.delete_alarm(idx),
-                                   fg=self.themes[self.current_theme]["fg"], 
-                                   bg=self.themes[self.current_theme]["button_bg"])
-            delete_btn.pack(side=tk.RIGHT, padx=10)
+    def export_alarms(self, path):
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            alarm_io.write_alarms(f, self.engine.iter_alarms(), alarm_io.is_ics(path))
+
+    def snooze_alarm(self, alarm_id, minutes):
+        alarm_time = self.engine.snooze(alarm_id, minutes)
+        if alarm_time is not None:
+            self.refresh_alarm_row(alarm_id)
+        return alarm_time
+
+    def call_in_ui(self, func, *args):
+        # Called on the control server thread.
+        future, run = deferred_call(func, *args)
+        self.dispatcher.post("call", run)
+        return future
 
+    def run_calls(self, calls):
+        for run in calls:
+            run()
+
+    def refresh_alarm_list(self):
+        self.dispatcher.mark_dirty(self.refresh_alarm_canvas)
+
+    def refresh_alarm_canvas(self):
         self.on_frame_configure(None)
 
-    def delete_alarm(self, index):
-        del self.alarms[index]
-        self.update_alarm_list()
+    def refresh_visible_rows(self):
+        top = self.alarm_canvas.canvasy(0)
+        height = self.alarm_canvas.winfo_height()
+        first = max(int(top // AlarmRow.HEIGHT), 0)
+        last = min(int((top + height) // AlarmRow.HEIGHT) + 1, len(self.alarm_order))
+        visible = self.alarm_order[first:last]
+
+        keep = set(visible)
+        for alarm_id in [i for i in self.alarm_rows if i not in keep]:
+            row = self.alarm_rows.pop(alarm_id)
+            row.hide()
+            self.row_pool.append(row)
+
+        width = max(self.alarm_canvas.winfo_width() - 10, 1)
+        for index, alarm_id in enumerate(visible, first):
+            row = self.alarm_rows.get(alarm_id)
+            if row is None:
+                row = self.row_pool.pop() if self.row_pool else AlarmRow(self)
+                alarm_time, alarm_name = self.alarms[alarm_id]
+                row.bind_alarm(alarm_id, alarm_name, alarm_time, alarm_id in self.engine.rules,
+                               self.engine.zones.get(alarm_id))
+                self.alarm_rows[alarm_id] = row
+            row.show(index, width)
 
-    def run_alarm(self, alarm_time, alarm_name):
-        while True:
-            time.sleep(1)
-            now = datetime.now()
-            if now.strftime("%H:%M") == alarm_time.strftime("%H:%M"):
-                print(f"Time to Wake up - {alarm_name}")
-                self.play_alarm_sound()
-                if self.show_math_challenge():
-                    self.stop_alarm_sound()
-                    self.delete_alarm_by_time(alarm_time)
-                    break
+    def update_alarm_list(self):
+        for row in self.alarm_rows.values():
+            row.hide()
+            self.row_pool.append(row)
+        self.alarm_rows.clear()
+        listed = set(self.alarm_order)
+        self.alarm_order = [i for i in self.alarm_order if i in self.alarms]
+        self.alarm_order.extend(i for i in self.alarms if i not in listed)
+        self.refresh_alarm_list()
+
+    def refresh_alarm_row(self, alarm_id):
+        row = self.alarm_rows.get(alarm_id)
+        if row is not None:
+            alarm_time, alarm_name = self.alarms[alarm_id]
+            row.bind_alarm(alarm_id, alarm_name, alarm_time, alarm_id in self.engine.rules,
+                           self.engine.zones.get(alarm_id))
+
+    def remove_alarm_row(self, alarm_id):
+        self.alarm_order.remove(alarm_id)
+        row = self.alarm_rows.pop(alarm_id, None)
+        if row is not None:
+            row.hide()
+            self.row_pool.append(row)
+
+    def delete_alarm(self, alarm_id):
+        if not self.engine.delete(alarm_id):
+            return False
+        self.remove_alarm_row(alarm_id)
+        self.refresh_alarm_list()
+        return True
+
+    def on_alarm_due(self, alarm_ids):
+        # Called on the scheduler thread with one coalesced group of due
+        # alarms; hand it to the Tk loop.
+        self.dispatcher.post("alarm_due", alarm_ids)
+
+    def run_alarms(self, groups):
+        # Every group that arrived in one drain rings as a single event, and
+        # alarms due while a challenge is already open join that challenge.
+        alarm_ids = [i for group in groups for i in group if i in self.alarms and i not in self.ringing]
+        if not alarm_ids:
+            return
+        for alarm_id in alarm_ids:
+            print(f"Time to Wake up - {self.alarms[alarm_id][1]}")
+        self.ringing.extend(alarm_ids)
+        names = [self.alarms[i][1] for i in self.ringing if i in self.alarms]
+        self.play_alarm_sounds(alarm_ids)
+        if self.challenge is not None:
+            self.challenge.set_alarm_names(names)
+            return
+        self.challenge = self.show_math_challenge(names, self.finish_alarms)
+
+    def finish_alarms(self, solved):
+        alarm_ids = [i for i in self.ringing if i in self.alarms]
+        self.ringing = []
+        self.challenge = None
+        self.stop_alarm_sound()
+        if solved:
+            self.complete_alarms(alarm_ids)
+            return
+        # Failed or dismissed: snooze the whole group. It rings again from
+        # the scheduler when the snooze runs out, with no polling meanwhile.
+        for alarm_id, _ in self.engine.snooze_many(alarm_ids):
+            self.refresh_alarm_row(alarm_id)
+
+    def complete_alarms(self, alarm_ids):
+        moved, deleted = self.engine.complete_many(alarm_ids)
+        for alarm_id in moved:
+            self.refresh_alarm_row(alarm_id)
+        for alarm_id in deleted:
+            self.remove_alarm_row(alarm_id)
+        if deleted:
+            self.refresh_alarm_list()
 
     def apply_theme(self, theme_name):
         self.current_theme = theme_name
-        self.canvas.config(bg=self.themes[theme_name]["bg"])
-        self.canvas.create_rectangle(0, 620, 500, 700, fill=self.themes[theme_name]["button_bg"], outline="")
-        
-        for widget in self.master.winfo_children():
-            if isinstance(widget, tk.Button):
-                widget.config(fg=self.themes[theme_name]["fg"], bg=self.themes[theme_name]["button_bg"])
-            elif isinstance(widget, tk.Label):
-                widget.config(fg=self.themes[theme_name]["fg"], bg=self.themes[theme_name]["bg"])
-        
-        self.alarm_frame.config(bg=self.themes[theme_name]["bg"])
-        self.alarm_canvas.config(bg=self.themes[theme_name]["bg"])
-        self.inner_frame.config(bg=self.themes[theme_name]["bg"])
-        
-        self.clock_canvas.config(bg=self.themes[theme_name]["clock_bg"])
-        self.clock_canvas.delete("all")
-        self.draw_clock_face()
-        
-        self.update_alarm_list()
+        self.theme.apply(theme_name)
         
     def get_theme_colors(self):
         return self.themes[self.current_theme]
-        
-    def open_settings(self):
-        SettingsPage(self.master, self) 
 
+    def get_timezone_index(self):
+        if self.timezone_index is None:
+            import pytz
+            self.timezone_index = TimezoneIndex(pytz.all_timezones, self.zone_offsets)
+        return self.timezone_index
+        
     def delete_alarm_by_time(self, alarm_time):
-        self.alarms = [(time, name) for time, name in self.alarms if time != alarm_time]
-        self.update_alarm_list()
+        self.delete_alarms([i for i, (t, _) in self.alarms.items() if t == alarm_time])
+
+    def delete_alarms(self, alarm_ids):
+        deleted = self.engine.delete_many(alarm_ids)
+        for alarm_id in deleted:
+            self.remove_alarm_row(alarm_id)
+        self.refresh_alarm_list()
+        return deleted
+
+    def show_page(self, page_class):
+        # One instance per page: later clicks show the hidden window again
+        # instead of building another one with its own tick loop.
+        page = self.pages.get(page_class)
+        if page is None or not page.winfo_exists():
+            page = self.pages[page_class] = page_class(self.master, self)
+        else:
+            page.show()
+        return page
 
     def open_settings(self):
-        SettingsPage(self.master, self)
+        self.show_page(SettingsPage)
             
     def open_alarm_page(self):
-        AlarmPage(self.master, self)
+        self.show_page(AlarmPage)
 
     def open_world_clock(self):
-        WorldClockPage(self.master, self)
+        self.show_page(WorldClockPage)
 
     def open_stopwatch(self):
-        StopwatchPage(self.master, self)
+        self.show_page(StopwatchPage)
 
     def open_timer(self):
-        TimerPage(self.master, self)
-
-    def play_alarm_sound(self):
-        winsound.PlaySound(self.alarm_sound, winsound.SND_ASYNC | winsound.SND_LOOP)
+        self.show_page(TimerPage)
+
+    def live_after_count(self):
+        return len(self.master.tk.splitlist(self.master.tk.call("after", "info")))
+
+    def debug_counts(self):
+        counts = {"after callbacks": self.live_after_count()}
+        for page_class, page in self.pages.items():
+            if page.winfo_exists():
+                counts[page_class.__name__] = "shown" if page.winfo_viewable() else "hidden"
+        counts.update(self.canvas_item_counts())
+        for name, stats in self.governor.stats().items():
+            counts[f"frames {name}"] = f"{stats['rendered']} drawn, {stats['skipped']} skipped"
+        counts.update(("dispatch " + k, v) for k, v in self.dispatcher.stats().items())
+        return counts
+
+    def play_alarm_sounds(self, alarm_ids):
+        # Each distinct ringtone in the group plays once, mixed with any
+        # that are already ringing and with running timer sounds.
+        for path in self.engine.ringtones(alarm_ids, self.alarm_sound):
+            if path not in self.alarm_sounds:
+                self.alarm_sounds.append(path)
+                self.audio.play(path, loop=True, key=f"alarm:{path}")
 
     def stop_alarm_sound(self):
-        winsound.PlaySound(None, 0)
+        for path in self.alarm_sounds:
+            self.audio.stop(f"alarm:{path}")
+        self.alarm_sounds = []
 
-    def show_math_challenge(self):
+    def show_math_challenge(self, alarm_names, on_done):
+        # Non-blocking: a nested wait_window would stall the dispatcher, and
+        # with it every control socket request, until the challenge closed.
         theme_colors = self.get_theme_colors()
-        challenge_window = MathChallenge(self.master, self, theme_colors)
-        self.master.wait_window(challenge_window)
-        return challenge_window.is_solved
+        challenge_window = MathChallenge(self.master, self, theme_colors, alarm_names)
+        def closed(event):
+            if event.widget is challenge_window:
+                on_done(challenge_window.is_solved)
+        challenge_window.bind("<Destroy>", closed)
+        return challenge_window
+
+class AlarmRow:
+    HEIGHT = 44
+
+    def __init__(self, app):
+        self.app = app
+        self.alarm_id = None
+        self.window = None
+        self.frame = app.theme.register(tk.Frame(app.alarm_canvas, bd=1, relief=tk.RAISED), "panel")
+        self.name_label = tk.Label(self.frame, font=("Helvetica", 12, "bold"))
+        self.name_label.pack(side=tk.LEFT, padx=10)
+        self.time_label = tk.Label(self.frame, font=("Helvetica", 12))
+        self.time_label.pack(side=tk.LEFT, padx=10)
+        self.delete_btn = tk.Button(self.frame, text="Delete", command=self.delete)
+        self.delete_btn.pack(side=tk.RIGHT, padx=10)
+        for widget in (self.name_label, self.time_label, self.delete_btn):
+            app.theme.register(widget, "panel_text")
+        for widget in (self.frame, self.name_label, self.time_label, self.delete_btn):
+            app.bind_alarm_wheel(widget)
+
+    def bind_alarm(self, alarm_id, alarm_name, alarm_time, repeats=False, zone=None):
+        self.alarm_id = alarm_id
+        self.name_label.config(text=alarm_name)
+        text = alarm_time.strftime("%a %H:%M ↻" if repeats else "%H:%M")
+        if zone:
+            text += " " + zone.rsplit("/", 1)[-1].replace("_", " ")
+        self.time_label.config(text=text)
+
+    def show(self, index, width):
+        canvas = self.app.alarm_canvas
+        y = index * self.HEIGHT + 5
+        if self.window is None:
+            self.window = canvas.create_window(5, y, window=self.frame, anchor="nw",
+                                               width=width, height=self.HEIGHT - 10)
+        else:
+            canvas.coords(self.window, 5, y)
+            canvas.itemconfigure(self.window, width=width)
+
+    def hide(self):
+        if self.window is not None:
+            self.app.alarm_canvas.delete(self.window)
+            self.window = None
+
+    def delete(self):
+        if self.alarm_id is not None:
+            self.app.delete_alarm(self.alarm_id)
 
 class MathChallenge(tk.Toplevel):
-    def __init__(self, parent, app, theme_colors):
+    MAX_NAMES = 4
+
+    def __init__(self, parent, app, theme_colors, alarm_names=()):
         super().__init__(parent)
         self.app = app
         self.theme_colors = theme_colors
+        self.alarm_names = list(alarm_names)
         self.title("Wake Up Challenge")
-        self.geometry("300x250")
+        self.geometry("300x280")
         self.is_solved = False
         self.questions_answered = 0
         self.total_questions = random.randint(3, 4)  # Randomly choose 3 or 4 questions
@@ -302,6 +1103,12 @@ class MathChallenge(tk.Toplevel):
                                        fg=self.theme_colors["fg"],
                                        bg=self.theme_colors["bg"])
         self.question_label.pack(pady=10)
+
+        self.alarms_label = tk.Label(self.main_frame, text=self.alarm_text(),
+                                     font=("Helvetica", 10), wraplength=260,
+                                     fg=self.theme_colors["fg"],
+                                     bg=self.theme_colors["bg"])
+        self.alarms_label.pack()
         
         self.math_label = tk.Label(self.main_frame, text=self.question, 
                                    font=("Helvetica", 18),
@@ -333,6 +1140,17 @@ class MathChallenge(tk.Toplevel):
         
         self.protocol("WM_DELETE_WINDOW", self.on_closing)
         
+    def alarm_text(self):
+        names = self.alarm_names[:self.MAX_NAMES]
+        extra = len(self.alarm_names) - len(names)
+        if extra:
+            names.append(f"and {extra} more")
+        return ", ".join(names)
+
+    def set_alarm_names(self, alarm_names):
+        self.alarm_names = list(alarm_names)
+        self.alarms_label.config(text=self.alarm_text())
+
     def generate_question(self):
         operations = ['+', '-', '*']
         operation = random.choice(operations)
@@ -360,7 +1178,7 @@ class MathChallenge(tk.Toplevel):
                     messagebox.showinfo("Success", "Alarm turned off. Have a great day!")
                     self.destroy()
                 else:
-                    messagebox.showerror("Failed", "Wrong answer on the final question. Alarm continues!")
+                    messagebox.showerror("Failed", "Wrong answer on the final question. Alarm snoozed!")
                     self.destroy()
             except ValueError:
                 messagebox.showerror("Invalid Input", "Please enter a valid number.")
@@ -373,62 +1191,144 @@ class MathChallenge(tk.Toplevel):
         self.progress_label.config(text=f"Question {self.questions_answered + 1} of {self.total_questions}")
         
     def on_closing(self):
-        if messagebox.askokcancel("Quit", "Are you sure you want to quit? The alarm will continue."):
+        if messagebox.askokcancel("Quit", "Are you sure you want to quit? The alarm will snooze."):
             self.destroy()
 
-class AlarmPage(tk.Toplevel):
+class Page(tk.Toplevel):
+    # Built once by AlarmApp.show_page and then only hidden and shown.
+    # Animated pages register their surfaces with AlarmApp.governor, which
+    # stops their ticks while the page is withdrawn, so a hidden page leaves
+    # no after() callbacks behind.
     def __init__(self, parent, app):
         super().__init__(parent)
         self.app = app
+        self.protocol("WM_DELETE_WINDOW", self.hide)
+
+    def show(self):
+        self.deiconify()
+        self.lift()
+        self.on_show()
+
+    def hide(self):
+        self.on_hide()
+        self.withdraw()
+
+    def on_show(self):
+        pass
+
+    def on_hide(self):
+        pass
+
+class AlarmPage(Page):
+    FILE_TYPES = [("CSV files", "*.csv"), ("iCalendar files", "*.ics"), ("All files", "*")]
+
+    def __init__(self, parent, app):
+        super().__init__(parent, app)
         self.title("Set Alarm")
-        self.geometry("400x300")
+        self.geometry("400x420")
         self.setup_ui()
         
     def setup_ui(self):
-        theme_colors = self.app.get_theme_colors()
-        self.configure(bg=theme_colors["bg"])
+        theme = self.app.theme
+        theme.register(self, "surface")
         
-        tk.Label(self, text="Set New Alarm", font=("Helvetica", 20, "bold"), fg=theme_colors["fg"], bg=theme_colors["bg"]).pack(pady=10)
+        theme.register(tk.Label(self, text="Set New Alarm", font=("Helvetica", 20, "bold")), "text").pack(pady=10)
         
-        name_frame = tk.Frame(self, bg=theme_colors["bg"])
+        name_frame = theme.register(tk.Frame(self), "surface")
         name_frame.pack(pady=10)
-        tk.Label(name_frame, text="Alarm Name:", font=("Helvetica", 12), fg=theme_colors["fg"], bg=theme_colors["bg"]).pack(side=tk.LEFT, padx=5)
+        theme.register(tk.Label(name_frame, text="Alarm Name:", font=("Helvetica", 12)), "text").pack(side=tk.LEFT, padx=5)
         self.name_entry = tk.Entry(name_frame, font=("Helvetica", 12))
         self.name_entry.pack(side=tk.LEFT, padx=5)
         
-        time_frame = tk.Frame(self, bg=theme_colors["bg"])
+        time_frame = theme.register(tk.Frame(self), "surface")
         time_frame.pack(pady=10)
-        tk.Label(time_frame, text="Set Time (HH:MM):", font=("Helvetica", 12), fg=theme_colors["fg"], bg=theme_colors["bg"]).pack(side=tk.LEFT, padx=5)
+        theme.register(tk.Label(time_frame, text="Set Time (HH:MM):", font=("Helvetica", 12)), "text").pack(side=tk.LEFT, padx=5)
         
         self.time_entry = tk.Entry(time_frame, font=("Helvetica", 12), width=5)
         self.time_entry.pack(side=tk.LEFT, padx=5)
-        
-        tk.Button(self, text="Set Alarm", font=("Helvetica", 12, "bold"), fg=theme_colors["fg"], bg=theme_colors["button_bg"], command=self.set_alarm).pack(pady=20)
-        
-        tk.Label(self, text="Select Ringtone:", font=("Helvetica", 12), fg=theme_colors["fg"], bg=theme_colors["bg"]).pack()
+
+        repeat_frame = theme.register(tk.Frame(self), "surface")
+        repeat_frame.pack(pady=5)
+        theme.register(tk.Label(repeat_frame, text="Repeat:", font=("Helvetica", 12)), "text").pack(side=tk.LEFT, padx=5)
+        # Presets, or any rule text such as "mon,wed every:2 except:2026-12-25".
+        self.repeat_var = tk.StringVar(value="once")
+        ttk.Combobox(repeat_frame, textvariable=self.repeat_var, width=24,
+                     values=["once", "daily", "weekdays", "weekends", "every:2"]).pack(side=tk.LEFT, padx=5)
+
+        zone_frame = theme.register(tk.Frame(self), "surface")
+        zone_frame.pack(pady=5)
+        theme.register(tk.Label(zone_frame, text="Time Zone:", font=("Helvetica", 12)), "text").pack(side=tk.LEFT, padx=5)
+        self.zone_var = tk.StringVar(value="Local")
+        self.zone_combo = ttk.Combobox(zone_frame, textvariable=self.zone_var, width=24, state="readonly",
+                                       values=self.zone_choices())
+        self.zone_combo.pack(side=tk.LEFT, padx=5)
+        
+        theme.register(tk.Button(self, text="Set Alarm", font=("Helvetica", 12, "bold"), command=self.set_alarm), "button").pack(pady=20)
+        
+        theme.register(tk.Label(self, text="Select Ringtone:", font=("Helvetica", 12)), "text").pack()
         self.ringtone_var = tk.StringVar(value=self.app.alarm_sound)
         ringtone_menu = ttk.Combobox(self, textvariable=self.ringtone_var, values=self.app.ringtones, state="readonly")
         ringtone_menu.pack(pady=5)
+
+        file_frame = theme.register(tk.Frame(self), "surface")
+        file_frame.pack(pady=5)
+        theme.register(tk.Button(file_frame, text="Import...", command=self.import_alarms), "button").pack(side=tk.LEFT, padx=5)
+        theme.register(tk.Button(file_frame, text="Export...", command=self.export_alarms), "button").pack(side=tk.LEFT, padx=5)
         
     def set_alarm(self):
         alarm_name = self.name_entry.get() or "Alarm"
         time_str = self.time_entry.get()
+        zone = None if self.zone_var.get() == "Local" else self.zone_var.get()
         try:
-            alarm_time = datetime.strptime(time_str, "%H:%M").time()
-            alarm_datetime = datetime.combine(datetime.now().date(), alarm_time)
-            if alarm_datetime <= datetime.now():
-                alarm_datetime += timedelta(days=1)
-            self.app.alarm_sound = self.ringtone_var.get()
-            self.app.add_alarm(alarm_datetime, alarm_name)
-            self.destroy()
+            datetime.strptime(time_str, "%H:%M")
         except ValueError:
             messagebox.showerror("Invalid Time", "Please enter a valid time in HH:MM format.")
+            return
+        alarm_datetime = parse_alarm_time(time_str, zone=zone)
+        repeat = self.repeat_var.get().strip()
+        try:
+            rule = None if repeat in ("", "once") else Recurrence.parse(repeat, alarm_datetime)
+            self.app.add_alarms([(alarm_datetime, alarm_name, rule, zone, self.ringtone_var.get())])
+        except ValueError as e:
+            messagebox.showerror("Invalid Repeat", str(e))
+            return
+        self.hide()
+
+    def import_alarms(self):
+        file_path = filedialog.askopenfilename(parent=self, filetypes=self.FILE_TYPES)
+        if not file_path:
+            return
+        try:
+            report = self.app.import_alarms(file_path)
+        except (OSError, alarm_io.FileFormatError) as e:
+            messagebox.showerror("Import Failed", str(e), parent=self)
+            return
+        show = messagebox.showwarning if report.rejected else messagebox.showinfo
+        show("Import Alarms", report.summary(), parent=self)
+        if report.accepted:
+            self.hide()
+
+    def export_alarms(self):
+        file_path = filedialog.asksaveasfilename(parent=self, defaultextension=".csv", filetypes=self.FILE_TYPES)
+        if not file_path:
+            return
+        try:
+            self.app.export_alarms(file_path)
+        except OSError as e:
+            messagebox.showerror("Export Failed", str(e), parent=self)
+
+    def zone_choices(self):
+        return ["Local"] + [zone for _, zone in self.app.world_cities]
+
+    def on_show(self):
+        self.name_entry.delete(0, tk.END)
+        self.time_entry.delete(0, tk.END)
+        self.zone_combo.config(values=self.zone_choices())
     
     def select_ringtone(self):
         file_path = filedialog.askopenfilename(filetypes=[("WAV files", "*.wav")])
         if file_path:
-            self.app.alarm_sound = file_path
-            self.ringtone_label.config(text=f"Current ringtone: {os.path.basename(file_path)}")
+            self.ringtone_var.set(file_path)
             
 class StopPage(tk.Toplevel):
     def __init__(self, parent):
@@ -450,334 +1350,464 @@ class StopPage(tk.Toplevel):
         
     def check_answer(self):
         if self.entry.get() == "69":
-            winsound.PlaySound(None, 0)
+            audio.get_engine().stop()
             self.destroy()
 
-class WorldClockPage(tk.Toplevel):
+class WorldClockPage(Page):
     def __init__(self, parent, app):
-        super().__init__(parent)
-        self.app = app
+        super().__init__(parent, app)
         self.title("World Clock")
         self.geometry("500x500")
-        self.cities = [
-            ("New York", "America/New_York"),
-            ("London", "Europe/London"),
-            ("Tokyo", "Asia/Tokyo"),
-            ("Sydney", "Australia/Sydney"),
-            ("Moscow", "Europe/Moscow")
-        ]
+        # Shared with AlarmPage, which offers these zones for pinning.
+        self.cities = app.world_cities
         self.setup_ui()
         
     def setup_ui(self):
-        theme_colors = self.app.get_theme_colors()
-        self.configure(bg=theme_colors["bg"])
+        theme = self.app.theme
+        theme.register(self, "surface")
         
-        tk.Label(self, text="World Clock", font=("Helvetica", 20, "bold"), fg=theme_colors["fg"], bg=theme_colors["bg"]).pack(pady=10)
+        theme.register(tk.Label(self, text="World Clock", font=("Helvetica", 20, "bold")), "text").pack(pady=10)
         
-        self.clock_frame = tk.Frame(self, bg=theme_colors["bg"])
+        self.clock_frame = theme.register(tk.Frame(self), "surface")
         self.clock_frame.pack(pady=10, fill=tk.BOTH, expand=True)
         
+        self.clock_rows = {}
         self.clock_labels = {}
+        self.surface = self.app.governor.register("world_clock", self.clock_frame, self.update_world_clocks, 1000,
+                                                  RenderGovernor.until_next_second)
         self.update_clock_display()
         
-        control_frame = tk.Frame(self, bg=theme_colors["bg"])
+        control_frame = theme.register(tk.Frame(self), "surface")
         control_frame.pack(pady=10, fill=tk.X)
         
         self.timezone_var = tk.StringVar()
-        self.timezone_combo = ttk.Combobox(control_frame, textvariable=self.timezone_var, values=sorted(pytz.all_timezones), state="readonly", width=30)
+        self.timezone_index = self.app.get_timezone_index()
+        self.timezone_combo = ttk.Combobox(control_frame, textvariable=self.timezone_var, values=self.timezone_index.zones, width=30)
         self.timezone_combo.pack(side=tk.LEFT, padx=5)
+        self.timezone_combo.bind("<KeyRelease>", self.filter_timezones)
         
-        add_button = tk.Button(control_frame, text="Add", command=self.add_timezone, fg=theme_colors["fg"], bg=theme_colors["button_bg"])
+        add_button = theme.register(tk.Button(control_frame, text="Add", command=self.add_timezone), "button")
         add_button.pack(side=tk.LEFT, padx=5)
         
-        remove_button = tk.Button(control_frame, text="Remove", command=self.remove_timezone, fg=theme_colors["fg"], bg=theme_colors["button_bg"])
+        remove_button = theme.register(tk.Button(control_frame, text="Remove", command=self.remove_timezone), "button")
         remove_button.pack(side=tk.LEFT, padx=5)
         
     def update_clock_display(self):
         for widget in self.clock_frame.winfo_children():
             widget.destroy()
-        
-        theme_colors = self.app.get_theme_colors()
+        self.clock_rows.clear()
+        self.clock_labels.clear()
+
         for city, timezone in self.cities:
-            frame = tk.Frame(self.clock_frame, bg=theme_colors["bg"])
-            frame.pack(fill=tk.X, pady=2)
-            
-            city_label = tk.Label(frame, text=f"{city}:", font=("Helvetica", 14, "bold"), fg=theme_colors["fg"], bg=theme_colors["bg"], width=20, anchor="e")
-            city_label.pack(side=tk.LEFT, padx=(0, 10))
-            
-            time_label = tk.Label(frame, text="", font=("Helvetica", 14), fg=theme_colors["fg"], bg=theme_colors["bg"], width=20, anchor="w")
-            time_label.pack(side=tk.LEFT)
-            
-            self.clock_labels[city] = time_label
+            self.add_clock_row(city, timezone)
+
+        self.surface.start()
+
+    def add_clock_row(self, city, timezone):
+        theme = self.app.theme
+        frame = theme.register(tk.Frame(self.clock_frame), "surface")
+        frame.pack(fill=tk.X, pady=2)
         
-        self.update_world_clocks()
+        city_label = theme.register(tk.Label(frame, text=f"{city}:", font=("Helvetica", 14, "bold"), width=20, anchor="e"), "text")
+        city_label.pack(side=tk.LEFT, padx=(0, 10))
         
-    def update_world_clocks(self):
-        for city, timezone in self.cities:
-            tz = pytz.timezone(timezone)
-            current_time = datetime.now(tz).strftime('%H:%M:%S %p')
-            self.clock_labels[city].config(text=current_time)
+        time_label = theme.register(tk.Label(frame, text="", font=("Helvetica", 14), width=20, anchor="w"), "text")
+        time_label.pack(side=tk.LEFT)
         
-        self.after(1000, self.update_world_clocks)
+        self.clock_rows[timezone] = frame
+        self.clock_labels[timezone] = time_label
+
+    def update_world_clocks(self):
+        now = time.time()
+        utc_seconds = int(now)
+        offsets = self.app.zone_offsets
+        for _, timezone in self.cities:
+            seconds = (utc_seconds + offsets.offset(timezone, now)) % 86400
+            hours, seconds = divmod(seconds, 3600)
+            minutes, seconds = divmod(seconds, 60)
+            suffix = "AM" if hours < 12 else "PM"
+            self.clock_labels[timezone].config(text=f"{hours:02d}:{minutes:02d}:{seconds:02d} {suffix}")
     
+    def filter_timezones(self, event):
+        if event.keysym in ("Up", "Down", "Return", "Escape"):
+            return
+        self.timezone_combo.config(values=self.timezone_index.search(self.timezone_var.get()))
+
+    def resolve_timezone(self):
+        import pytz
+        query = self.timezone_var.get().strip()
+        if query in pytz.all_timezones_set:
+            return query
+        results = self.timezone_index.search(query) if query else []
+        return results[0] if results else None
+
     def add_timezone(self):
-        new_timezone = self.timezone_var.get()
-        if new_timezone:
+        new_timezone = self.resolve_timezone()
+        if new_timezone and new_timezone not in self.clock_labels:
             city_name = new_timezone.split('/')[-1].replace('_', ' ')
             self.cities.append((city_name, new_timezone))
-            self.update_clock_display()
+            self.add_clock_row(city_name, new_timezone)
+            self.surface.redraw()
     
     def remove_timezone(self):
-        selected_timezone = self.timezone_var.get()
-        self.cities = [city for city in self.cities if city[1] != selected_timezone]
-        self.update_clock_display()
+        selected_timezone = self.resolve_timezone()
+        if selected_timezone in self.clock_rows:
+            self.cities[:] = [city for city in self.cities if city[1] != selected_timezone]
+            self.clock_rows.pop(selected_timezone).destroy()
+            del self.clock_labels[selected_timezone]
 
-class TimerPage(tk.Toplevel):
+class TimerPage(Page):
     def __init__(self, parent, app):
-        super().__init__(parent)
-        self.app = app
+        super().__init__(parent, app)
         self.title("Timer")
         self.geometry("300x500")
-        self.running = False
-        self.remaining_time = timedelta()
+        self.timer_name = f"timer-{self.winfo_id()}"
         self.timer_sound = "default_alarm.wav"
         self.setup_ui()
+        self.surface = self.app.governor.register("timer", self.canvas, self.update_timer, 1000, self.until_next_second)
 
     def setup_ui(self):
-        theme_colors = self.app.get_theme_colors()
-        self.configure(bg=theme_colors["bg"])
+        theme = self.app.theme
+        theme.register(self, "surface")
         
-        main_frame = tk.Frame(self, bg=theme_colors["bg"])
+        main_frame = theme.register(tk.Frame(self), "surface")
         main_frame.pack(expand=True)
         
-        input_frame = tk.Frame(main_frame, bg=theme_colors["bg"])
+        input_frame = theme.register(tk.Frame(main_frame), "surface")
         input_frame.pack(pady=10)
 
         self.hours_entry = tk.Entry(input_frame, width=3)
         self.hours_entry.pack(side=tk.LEFT)
-        tk.Label(input_frame, text="h", fg=theme_colors["fg"], bg=theme_colors["bg"]).pack(side=tk.LEFT)
+        theme.register(tk.Label(input_frame, text="h"), "text").pack(side=tk.LEFT)
 
         self.minutes_entry = tk.Entry(input_frame, width=3)
         self.minutes_entry.pack(side=tk.LEFT)
-        tk.Label(input_frame, text="m", fg=theme_colors["fg"], bg=theme_colors["bg"]).pack(side=tk.LEFT)
+        theme.register(tk.Label(input_frame, text="m"), "text").pack(side=tk.LEFT)
 
         self.seconds_entry = tk.Entry(input_frame, width=3)
         self.seconds_entry.pack(side=tk.LEFT)
-        tk.Label(input_frame, text="s", fg=theme_colors["fg"], bg=theme_colors["bg"]).pack(side=tk.LEFT)
+        theme.register(tk.Label(input_frame, text="s"), "text").pack(side=tk.LEFT)
 
-        self.canvas = tk.Canvas(main_frame, width=250, height=250, bg=theme_colors["clock_bg"], highlightthickness=0)
+        self.canvas = theme.register_canvas(tk.Canvas(main_frame, width=250, height=250, highlightthickness=0))
         self.canvas.pack(pady=20)
 
         self.draw_timer_face()
+        self.create_hands()
 
-        self.time_label = tk.Label(main_frame, text="00:00:00", font=("Helvetica", 18), fg=theme_colors["fg"], bg=theme_colors["bg"])
+        self.time_label = theme.register(tk.Label(main_frame, text="00:00:00", font=("Helvetica", 18)), "text")
         self.time_label.pack(pady=10)
 
-        tk.Label(main_frame, text="Select Ringtone:", font=("Helvetica", 12), fg=theme_colors["fg"], bg=theme_colors["bg"]).pack()
+        theme.register(tk.Label(main_frame, text="Select Ringtone:", font=("Helvetica", 12)), "text").pack()
         self.ringtone_var = tk.StringVar(value=self.timer_sound)
         ringtone_menu = ttk.Combobox(main_frame, textvariable=self.ringtone_var, values=self.app.ringtones, state="readonly")
         ringtone_menu.pack(pady=5)
 
-        button_frame = tk.Frame(main_frame, bg=theme_colors["bg"])
+        button_frame = theme.register(tk.Frame(main_frame), "surface")
         button_frame.pack(pady=10)
 
-        self.start_stop_button = tk.Button(button_frame, text="Start", command=self.toggle_timer, fg=theme_colors["fg"], bg=theme_colors["button_bg"])
+        self.start_stop_button = theme.register(tk.Button(button_frame, text="Start", command=self.toggle_timer), "button")
         self.start_stop_button.pack(side=tk.LEFT, padx=5)
 
-        self.reset_button = tk.Button(button_frame, text="Reset", command=self.reset_timer, fg=theme_colors["fg"], bg=theme_colors["button_bg"])
+        self.reset_button = theme.register(tk.Button(button_frame, text="Reset", command=self.reset_timer), "button")
         self.reset_button.pack(side=tk.LEFT, padx=5)
 
     def draw_timer_face(self):
-        theme_colors = self.app.get_theme_colors()
-        self.canvas.create_oval(10, 10, 240, 240, outline=theme_colors["clock_fg"], width=2)
-        for i in range(60):
-            angle = i * math.pi / 30 - math.pi / 2
-            start = 110 if i % 5 == 0 else 115
-            x1 = 125 + start * math.cos(angle)
-            y1 = 125 + start * math.sin(angle)
-            x2 = 125 + 120 * math.cos(angle)
-            y2 = 125 + 120 * math.sin(angle)
-            self.canvas.create_line(x1, y1, x2, y2, fill=theme_colors["clock_fg"])
+        theme = self.app.theme
+        self.canvas.create_oval(10, 10, 240, 240, width=2, tags="theme.face", **theme.item("theme.face"))
+        dial.draw_ticks(self.canvas, dial.TIMER_TICKS, tags="theme.tick", **theme.item("theme.tick"))
+
+    def create_hands(self):
+        hand = self.app.theme.item("theme.hand")
+        second_hand = self.app.theme.item("theme.second_hand")
+        self.hour_hand = self.canvas.create_line(125, 125, 125, 125, width=4, tags=("hands", "theme.hand"), state="hidden", **hand)
+        self.minute_hand = self.canvas.create_line(125, 125, 125, 125, width=3, tags=("hands", "theme.hand"), state="hidden", **hand)
+        self.second_hand = self.canvas.create_line(125, 125, 125, 125, width=2, tags=("hands", "theme.second_hand"), state="hidden", **second_hand)
 
     def toggle_timer(self):
-        if self.running:
-            self.running = False
+        timer = self.app.timers.get(self.timer_name)
+        if timer is not None and timer.running:
+            self.app.timers.pause(self.timer_name)
+            self.surface.stop()
             self.start_stop_button.config(text="Start")
         else:
-            if self.remaining_time.total_seconds() == 0:
+            if timer is None or timer.remaining() == 0:
                 try:
                     hours = int(self.hours_entry.get() or 0)
                     minutes = int(self.minutes_entry.get() or 0)
                     seconds = int(self.seconds_entry.get() or 0)
-                    self.remaining_time = timedelta(hours=hours, minutes=minutes, seconds=seconds)
                 except ValueError:
                     messagebox.showerror("Invalid Input", "Please enter valid numbers for hours, minutes, and seconds.")
                     return
+                total = hours * 3600 + minutes * 60 + seconds
+                if total <= 0:
+                    return
+                timer = self.app.timers.add(self.timer_name, total, self.finish_timer)
 
-            self.running = True
+            self.app.timers.start(self.timer_name)
             self.start_stop_button.config(text="Stop")
-            self.update_timer()
+            self.surface.start()
 
     def update_timer(self):
-        if self.running and self.remaining_time.total_seconds() > 0:
-            self.remaining_time -= timedelta(seconds=1)
-            self.update_display()
-            self.after(1000, self.update_timer)
-        elif self.remaining_time.total_seconds() <= 0:
-            self.running = False
-            self.start_stop_button.config(text="Start")
-            self.time_label.config(text="00:00:00")
-            self.canvas.delete("hands")
-            self.play_timer_sound()
-            self.show_times_up_message()
+        # The countdown itself only schedules its finish; the display ticks
+        # come from the render governor and stop while the page is hidden.
+        timer = self.app.timers.get(self.timer_name)
+        if timer is not None:
+            self.update_display(timer.remaining())
+
+    def until_next_second(self):
+        timer = self.app.timers.get(self.timer_name)
+        if timer is None:
+            return 1000
+        return int((timer.remaining() % 1 or 1) * 1000) + 1
+
+    def finish_timer(self, timer):
+        self.surface.stop()
+        if not self.winfo_viewable():
+            self.show()
+        self.start_stop_button.config(text="Start")
+        self.time_label.config(text="00:00:00")
+        self.canvas.itemconfigure("hands", state="hidden")
+        self.play_timer_sound()
+        self.show_times_up_message()
 
-    def update_display(self):
-        theme_colors = self.app.get_theme_colors()
-        total_seconds = self.remaining_time.total_seconds()
+    def update_display(self, remaining):
+        total_seconds = math.ceil(remaining)
         hours, remainder = divmod(total_seconds, 3600)
         minutes, seconds = divmod(remainder, 60)
-        time_str = f"{int(hours):02d}:{int(minutes):02d}:{int(seconds):02d}"
+        time_str = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
         self.time_label.config(text=time_str)
 
-        self.canvas.delete("hands")
-        
-        hour_angle = (hours + minutes / 60) * math.pi / 6 - math.pi / 2
-        hour_x = 125 + 60 * math.cos(hour_angle)
-        hour_y = 125 + 60 * math.sin(hour_angle)
-        self.canvas.create_line(125, 125, hour_x, hour_y, fill=theme_colors["clock_hands"], width=4, tags="hands")
-
-        minute_angle = (minutes + seconds / 60) * math.pi / 30 - math.pi / 2
-        minute_x = 125 + 90 * math.cos(minute_angle)
-        minute_y = 125 + 90 * math.sin(minute_angle)
-        self.canvas.create_line(125, 125, minute_x, minute_y, fill=theme_colors["clock_hands"], width=3, tags="hands")
+        hour, minute, second = dial.timer_hands(total_seconds)
+        self.canvas.coords(self.hour_hand, hour)
+        self.canvas.coords(self.minute_hand, minute)
+        self.canvas.coords(self.second_hand, second)
 
-        second_angle = seconds * math.pi / 30 - math.pi / 2
-        second_x = 125 + 110 * math.cos(second_angle)
-        second_y = 125 + 110 * math.sin(second_angle)
-        self.canvas.create_line(125, 125, second_x, second_y, fill=theme_colors["clock_second_hand"], width=2, tags="hands")
+        self.canvas.itemconfigure("hands", state="normal")
 
     def reset_timer(self):
-        self.running = False
+        self.surface.stop()
+        self.app.timers.remove(self.timer_name)
         self.start_stop_button.config(text="Start")
-        self.remaining_time = timedelta()
         self.time_label.config(text="00:00:00")
         self.hours_entry.delete(0, tk.END)
         self.minutes_entry.delete(0, tk.END)
         self.seconds_entry.delete(0, tk.END)
-        self.canvas.delete("hands")
+        self.canvas.itemconfigure("hands", state="hidden")
 
     def play_timer_sound(self):
         selected_sound = self.ringtone_var.get()
-        winsound.PlaySound(selected_sound, winsound.SND_ASYNC | winsound.SND_LOOP)
+        self.app.audio.play(selected_sound, loop=True, key=self.timer_name)
 
     def show_times_up_message(self):
         messagebox.showinfo("Timer", "Time's up!")
-        winsound.PlaySound(None, winsound.SND_PURGE)
+        self.app.audio.stop(self.timer_name)
+
+def format_elapsed(seconds):
+    millis = int(seconds * 1000)
+    seconds, millis = divmod(millis, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}.{millis:03d}"
+
+class LapList:
+    # Only `rows` lines ever live in the Listbox; scrolling rewrites them from
+    # the lap array, so the widget cost is flat no matter how many laps exist.
+    def __init__(self, parent, laps, rows, theme):
+        self.laps = laps
+        self.rows = rows
+        self.offset = 0
+        self.frame = theme.register(tk.Frame(parent), "surface")
+        self.listbox = tk.Listbox(self.frame, height=rows, font=("Consolas", 10), activestyle="none",
+                                  highlightthickness=0)
+        theme.register(self.listbox, "panel_text")
+        self.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar = ttk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self.scroll)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.listbox.bind("<MouseWheel>", lambda e: self.scroll("scroll", -1 if e.delta > 0 else 1, "units"))
+        self.listbox.bind("<Button-4>", lambda e: self.scroll("scroll", -1, "units"))
+        self.listbox.bind("<Button-5>", lambda e: self.scroll("scroll", 1, "units"))
+        self.render()
+
+    def scroll(self, *args):
+        if args[0] == "moveto":
+            self.set_offset(int(float(args[1]) * len(self.laps)))
+        else:
+            step = int(args[1]) * (self.rows if args[2] == "pages" else 1)
+            self.set_offset(self.offset + step)
+        return "break"
+
+    def set_offset(self, offset):
+        self.offset = max(0, min(offset, len(self.laps) - self.rows))
+        self.render()
+
+    def render(self):
+        count = len(self.laps)
+        end = min(self.offset + self.rows, count)
+        self.listbox.delete(0, tk.END)
+        for index in range(self.offset, end):
+            self.listbox.insert(tk.END, self.format_lap(index))
+        if count:
+            self.scrollbar.set(self.offset / count, end / count)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def format_lap(self, index):
+        split = self.laps[index]
+        lap = split - (self.laps[index - 1] if index else 0.0)
+        return f"Lap {index + 1:<6d}{format_elapsed(lap)}  {format_elapsed(split)}"
+
+    def lap_added(self):
+        if self.offset + self.rows >= len(self.laps) - 1:
+            self.set_offset(len(self.laps))
+        else:
+            self.render()
+
+class StopwatchPage(Page):
+    FRAME_MS = 16
+    LAP_ROWS = 6
 
-class StopwatchPage(tk.Toplevel):
     def __init__(self, parent, app):
-        super().__init__(parent)
-        self.app = app
+        super().__init__(parent, app)
         self.title("Stopwatch")
-        self.geometry("300x400")
+        self.geometry("300x560")
         self.running = False
         self.start_time = None
-        self.elapsed_time = timedelta()
+        self.elapsed = 0.0
+        self.laps = array("d")
+        self.shown_text = None
+        self.shown_hands = (None, None)
         self.setup_ui()
+        self.surface = self.app.governor.register("stopwatch", self.canvas, self.update_stopwatch, self.FRAME_MS)
 
     def setup_ui(self):
-        theme_colors = self.app.get_theme_colors()
-        self.configure(bg=theme_colors["bg"])
+        theme = self.app.theme
+        theme.register(self, "surface")
         
-        main_frame = tk.Frame(self, bg=theme_colors["bg"])
+        main_frame = theme.register(tk.Frame(self), "surface")
         main_frame.pack(expand=True)
         
-        self.canvas = tk.Canvas(main_frame, width=250, height=250, bg=theme_colors["clock_bg"], highlightthickness=0)
+        self.canvas = theme.register_canvas(tk.Canvas(main_frame, width=250, height=250, highlightthickness=0))
         self.canvas.pack(pady=20)
 
         self.draw_stopwatch_face()
+        self.create_hands()
         
-        self.time_label = tk.Label(main_frame, text="00:00:00.000", font=("Helvetica", 18), fg=theme_colors["fg"], bg=theme_colors["bg"])
+        self.time_label = theme.register(tk.Label(main_frame, text="00:00:00.000", font=("Helvetica", 18)), "text")
         self.time_label.pack(pady=10)
 
-        button_frame = tk.Frame(main_frame, bg=theme_colors["bg"])
+        button_frame = theme.register(tk.Frame(main_frame), "surface")
         button_frame.pack(pady=10)
 
-        self.start_stop_button = tk.Button(button_frame, text="Start", command=self.toggle_stopwatch, fg=theme_colors["fg"], bg=theme_colors["button_bg"])
+        self.start_stop_button = theme.register(tk.Button(button_frame, text="Start", command=self.toggle_stopwatch), "button")
         self.start_stop_button.pack(side=tk.LEFT, padx=5)
 
-        self.reset_button = tk.Button(button_frame, text="Reset", command=self.reset_stopwatch, fg=theme_colors["fg"], bg=theme_colors["button_bg"])
+        self.lap_button = theme.register(tk.Button(button_frame, text="Lap", command=self.record_lap), "button")
+        self.lap_button.pack(side=tk.LEFT, padx=5)
+
+        self.reset_button = theme.register(tk.Button(button_frame, text="Reset", command=self.reset_stopwatch), "button")
         self.reset_button.pack(side=tk.LEFT, padx=5)
 
+        self.export_button = theme.register(tk.Button(button_frame, text="Export", command=self.export_laps), "button")
+        self.export_button.pack(side=tk.LEFT, padx=5)
+
+        self.lap_list = LapList(main_frame, self.laps, self.LAP_ROWS, theme)
+        self.lap_list.frame.pack(fill=tk.X, pady=5)
+
     def draw_stopwatch_face(self):
-        theme_colors = self.app.get_theme_colors()
-        self.canvas.create_oval(10, 10, 240, 240, outline=theme_colors["clock_fg"], width=2)
-        for i in range(60):
-            angle = i * math.pi / 30 - math.pi / 2
-            start = 110 if i % 5 == 0 else 115
-            x1 = 125 + start * math.cos(angle)
-            y1 = 125 + start * math.sin(angle)
-            x2 = 125 + 120 * math.cos(angle)
-            y2 = 125 + 120 * math.sin(angle)
-            self.canvas.create_line(x1, y1, x2, y2, fill=theme_colors["clock_fg"])
+        theme = self.app.theme
+        self.canvas.create_oval(10, 10, 240, 240, width=2, tags="theme.face", **theme.item("theme.face"))
+        dial.draw_ticks(self.canvas, dial.STOPWATCH_TICKS, tags="theme.tick", **theme.item("theme.tick"))
+
+    def create_hands(self):
+        hand = self.app.theme.item("theme.hand")
+        second_hand = self.app.theme.item("theme.second_hand")
+        self.minute_hand = self.canvas.create_line(125, 125, 125, 125, width=3, tags=("hands", "theme.hand"), state="hidden", **hand)
+        self.second_hand = self.canvas.create_line(125, 125, 125, 125, width=2, tags=("hands", "theme.second_hand"), state="hidden", **second_hand)
 
     def toggle_stopwatch(self):
         if self.running:
             self.running = False
             self.start_stop_button.config(text="Start")
+            self.elapsed = time.perf_counter() - self.start_time
+            self.surface.stop()
+            self.update_display()
         else:
             self.running = True
             self.start_stop_button.config(text="Stop")
-            self.start_time = time.time() - self.elapsed_time.total_seconds()
-            self.update_stopwatch()
+            self.start_time = time.perf_counter() - self.elapsed
+            self.surface.start()
 
     def update_stopwatch(self):
-        if self.running:
-            self.elapsed_time = timedelta(seconds=time.time() - self.start_time)
-            self.update_display()
-            self.after(16, self.update_stopwatch)
+        # Elapsed time comes from perf_counter, so nothing needs to tick
+        # while the window is hidden or minimised.
+        self.elapsed = time.perf_counter() - self.start_time
+        self.update_display()
 
     def update_display(self):
-        theme_colors = self.app.get_theme_colors()
-        total_seconds = self.elapsed_time.total_seconds()
-        hours, remainder = divmod(total_seconds, 3600)
-        minutes, seconds = divmod(remainder, 60)
-        milliseconds = int((seconds % 1) * 1000)
-        time_str = f"{int(hours):02d}:{int(minutes):02d}:{int(seconds):02d}.{milliseconds:03d}"
-        self.time_label.config(text=time_str)
-
-        self.canvas.delete("hands")
-        
-        minute_angle = total_seconds / 30 - math.pi / 2
-        minute_x = 125 + 90 * math.cos(minute_angle)
-        minute_y = 125 + 90 * math.sin(minute_angle)
-        self.canvas.create_line(125, 125, minute_x, minute_y, fill=theme_colors["clock_hands"], width=3, tags="hands")
-
-        second_angle = (total_seconds % 60) * math.pi / 30 - math.pi / 2
-        second_x = 125 + 110 * math.cos(second_angle)
-        second_y = 125 + 110 * math.sin(second_angle)
-        self.canvas.create_line(125, 125, second_x, second_y, fill=theme_colors["clock_second_hand"], width=2, tags="hands")
+        text = format_elapsed(self.elapsed)
+        if text != self.shown_text:
+            self.time_label.config(text=text)
+            self.shown_text = text
+
+        minute, second = dial.stopwatch_hands(self.elapsed)
+        shown_minute, shown_second = self.shown_hands
+        if shown_minute is None:
+            self.canvas.itemconfigure("hands", state="normal")
+        if minute is not shown_minute:
+            self.canvas.coords(self.minute_hand, minute)
+        if second is not shown_second:
+            self.canvas.coords(self.second_hand, second)
+        self.shown_hands = (minute, second)
+
+    def record_lap(self):
+        if not self.running:
+            return
+        self.laps.append(time.perf_counter() - self.start_time)
+        self.lap_list.lap_added()
+
+    def export_laps(self):
+        if not self.laps:
+            return
+        file_path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV files", "*.csv")])
+        if not file_path:
+            return
+        try:
+            with open(file_path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["lap", "lap_time", "split"])
+                previous = 0.0
+                for index, split in enumerate(self.laps, 1):
+                    writer.writerow([index, f"{split - previous:.3f}", f"{split:.3f}"])
+                    previous = split
+        except OSError as e:
+            messagebox.showerror("Export Failed", str(e), parent=self)
 
     def reset_stopwatch(self):
         self.running = False
+        self.surface.stop()
         self.start_stop_button.config(text="Start")
-        self.elapsed_time = timedelta()
+        self.elapsed = 0.0
         self.update_display()
-        self.canvas.delete("hands")
+        self.canvas.itemconfigure("hands", state="hidden")
+        self.shown_hands = (None, None)
+        del self.laps[:]
+        self.lap_list.set_offset(0)
 
-class SettingsPage(tk.Toplevel):
+class SettingsPage(Page):
     def __init__(self, parent, app):
-        super().__init__(parent)
-        self.app = app
+        super().__init__(parent, app)
         self.title("Settings")
-        self.geometry("300x200")
+        self.geometry("420x560")
         self.setup_ui()
         
     def setup_ui(self):
-        main_frame = tk.Frame(self)
-        main_frame.pack(expand=True)
-        
-        tk.Label(main_frame, text="Settings", font=("Helvetica", 20, "bold")).pack(pady=10)
+        tk.Label(self, text="Settings", font=("Helvetica", 20, "bold")).pack(pady=10)
+        notebook = ttk.Notebook(self)
+        notebook.pack(expand=True, fill=tk.BOTH, padx=10, pady=(0, 10))
+        main_frame = tk.Frame(notebook)
+        notebook.add(main_frame, text="General")
+        debug_frame = tk.Frame(notebook)
+        notebook.add(debug_frame, text="Debug")
         
         tk.Label(main_frame, text="Select Theme:").pack()
         self.theme_var = tk.StringVar(value=self.app.current_theme)
@@ -786,12 +1816,70 @@ class SettingsPage(tk.Toplevel):
         
         apply_button = tk.Button(main_frame, text="Apply Theme", command=self.apply_theme)
         apply_button.pack(pady=10)
+
+        policy = self.app.engine.snooze_policy
+        tk.Label(main_frame, text="Snooze minutes (each snooze, last repeats):").pack()
+        self.snooze_var = tk.StringVar(value=", ".join(f"{m:g}" for m in policy.intervals))
+        tk.Entry(main_frame, textvariable=self.snooze_var, width=20).pack(pady=5)
+
+        tk.Label(main_frame, text=f"After {policy.escalate_after} snoozes, ring with:").pack()
+        self.escalate_var = tk.StringVar(value=policy.escalate_ringtone or "Same ringtone")
+        ttk.Combobox(main_frame, textvariable=self.escalate_var, state="readonly",
+                     values=["Same ringtone"] + self.app.ringtones).pack(pady=5)
+
+        tk.Button(main_frame, text="Apply Snooze", command=self.apply_snooze).pack(pady=10)
+
+        self.debug_label = tk.Label(debug_frame, font=("Consolas", 9), justify=tk.LEFT)
+        self.debug_label.pack(pady=5)
+
+        tick_stats = self.app.tick_stats
+        self.tick_stats_var = tk.BooleanVar(value=tick_stats.enabled)
+        tk.Checkbutton(debug_frame, text="Record tick latency (ms)", variable=self.tick_stats_var,
+                       command=self.toggle_tick_stats).pack()
+        self.tick_label = tk.Label(debug_frame, font=("Consolas", 9), justify=tk.LEFT)
+        self.tick_label.pack(pady=5)
+
+        button_frame = tk.Frame(debug_frame)
+        button_frame.pack(pady=5)
+        tk.Button(button_frame, text="Refresh", command=self.refresh_debug).pack(side=tk.LEFT, padx=5)
+        tk.Button(button_frame, text="Reset", command=self.reset_tick_stats).pack(side=tk.LEFT, padx=5)
+        self.refresh_debug()
         
     def apply_theme(self):
         selected_theme = self.theme_var.get()
         self.app.apply_theme(selected_theme)
         messagebox.showinfo("Theme Applied", f"The {selected_theme} theme has been applied.")
 
+    def on_show(self):
+        self.refresh_debug()
+
+    def refresh_debug(self):
+        counts = self.app.debug_counts()
+        width = max(map(len, counts))
+        self.debug_label.config(text="\n".join(f"{k:<{width}} {v}" for k, v in counts.items()))
+        tick_stats = self.app.tick_stats
+        self.tick_label.config(text=tick_stats.report() if tick_stats.callbacks else
+                               "No samples" if tick_stats.enabled else "Recording is off")
+
+    def toggle_tick_stats(self):
+        self.app.tick_stats.enabled = self.tick_stats_var.get()
+        self.refresh_debug()
+
+    def reset_tick_stats(self):
+        self.app.tick_stats.reset()
+        self.refresh_debug()
+
+    def apply_snooze(self):
+        escalate = self.escalate_var.get()
+        engine = self.app.engine
+        try:
+            engine.snooze_policy = SnoozePolicy(
+                SnoozePolicy.parse_intervals(self.snooze_var.get()), engine.snooze_policy.escalate_after,
+                None if escalate == "Same ringtone" else escalate)
+        except ValueError:
+            messagebox.showerror("Invalid Snooze", "Enter one or more numbers of minutes, each above 0 and "
+                                 f"at most {SnoozePolicy.MAX_MINUTES}, e.g. 9, 5, 3.")
+
 if __name__ == "__main__":
     root = tk.Tk()
     app = AlarmApp(root)
@@ -0,0 +1,250 @@
+import time
+import heapq
+import threading
+from datetime import datetime, timedelta
+from itertools import islice
+
+import pytest
+import pytz
+
+import alarm_core
+from alarm_core import AlarmEngine, AlarmScheduler, AlarmStore, Recurrence, SnoozePolicy, ZoneOffsetCache
+
+EPOCH_2026 = 1767225600  # 2026-01-01T00:00:00Z
+
+def utc(*args):
+    return (datetime(*args) - ZoneOffsetCache.UNIX_EPOCH).total_seconds()
+
+@pytest.fixture
+def offsets():
+    return ZoneOffsetCache()
+
+@pytest.mark.parametrize("zone", ["UTC", "GMT", "Etc/GMT+5"])
+def test_zone_without_transitions_has_one_window(offsets, zone):
+    expected = int(pytz.timezone(zone).utcoffset(datetime(2026, 6, 1)).total_seconds())
+    assert offsets.offset(zone, EPOCH_2026) == expected
+    assert offsets._offsets[zone][1:] == (float("-inf"), float("inf"))
+
+def test_offset_window_spans_the_current_transitions(offsets):
+    assert offsets.offset("Europe/London", utc(2026, 6, 1)) == 3600
+    assert offsets._offsets["Europe/London"][1:] == (utc(2026, 3, 29, 1), utc(2026, 10, 25, 1))
+
+def test_epoch_of_first_transition_is_finite(offsets):
+    times, _ = offsets.table("Europe/London")
+    assert offsets._epoch("Europe/London", 0) == (times[0] - ZoneOffsetCache.UNIX_EPOCH).total_seconds()
+    assert offsets._epoch("Europe/London", -1) == float("-inf")
+    assert offsets._epoch("Europe/London", len(times)) == float("inf")
+
+@pytest.mark.parametrize("zone", ["America/New_York", "Europe/London", "Australia/Lord_Howe", "Asia/Kolkata"])
+def test_offsets_match_pytz(offsets, zone):
+    tz = pytz.timezone(zone)
+    for when in range(EPOCH_2026, EPOCH_2026 + 366 * 86400, 7 * 3600 + 13):
+        expected = int(datetime.fromtimestamp(when, tz).utcoffset().total_seconds())
+        assert offsets.offset(zone, when) == expected
+        assert offsets.offset_at(zone, when) == expected
+
+@pytest.mark.parametrize("zone", ["America/New_York", "Europe/Berlin", "Asia/Tokyo"])
+def test_resolve_inverts_wall(offsets, zone):
+    for when in range(EPOCH_2026, EPOCH_2026 + 366 * 86400, 11 * 3600):
+        assert offsets.resolve(zone, offsets.wall(zone, when)) == when
+
+def test_resolve_gap_and_overlap(offsets):
+    # 01:30 does not exist on 2026-03-29 in London and happens twice on
+    # 2026-10-25.
+    assert offsets.resolve("Europe/London", datetime(2026, 3, 29, 1, 30)) == utc(2026, 3, 29, 1)
+    assert offsets.resolve("Europe/London", datetime(2026, 10, 25, 1, 30)) == utc(2026, 10, 25, 0, 30)
+
+def test_recurrence_text_round_trips():
+    rule = Recurrence.parse("weekdays every:3 on:2026-12-25 except:2026-11-02", datetime(2026, 10, 19, 7, 30))
+    text = str(rule)
+    assert text == "from:2026-10-19T07:30 days:mon,tue,wed,thu,fri every:3 on:2026-12-25 except:2026-11-02"
+    assert str(Recurrence.parse(text)) == text
+
+def test_recurrence_weekdays():
+    rule = Recurrence.parse("mon,wed", datetime(2026, 10, 19, 7, 0))  # a Monday
+    after = datetime(2026, 10, 19, 7, 0)
+    assert list(islice(rule.occurrences(after), 3)) == [
+        datetime(2026, 10, 21, 7, 0), datetime(2026, 10, 26, 7, 0), datetime(2026, 10, 28, 7, 0)]
+
+def test_recurrence_interval_and_skip():
+    rule = Recurrence.parse("every:2 except:2026-10-21", datetime(2026, 10, 19, 6, 15))
+    assert list(islice(rule.occurrences(datetime(2026, 10, 1)), 3)) == [
+        datetime(2026, 10, 19, 6, 15), datetime(2026, 10, 23, 6, 15), datetime(2026, 10, 25, 6, 15)]
+
+def test_recurrence_dates_run_out():
+    rule = Recurrence.parse("on:2026-11-01,2026-11-05", datetime(2026, 10, 19, 9, 0))
+    assert rule.next(datetime(2026, 11, 1, 9, 0)) == datetime(2026, 11, 5, 9, 0)
+    assert rule.next(datetime(2026, 11, 5, 9, 0)) is None
+
+def test_recurrence_never_before_start():
+    rule = Recurrence.parse("daily", datetime(2026, 10, 19, 7, 0, 30))
+    assert rule.next(datetime(2026, 1, 1)) == datetime(2026, 10, 19, 7, 0, 30)
+    assert rule.next(datetime(2026, 10, 19, 7, 0, 30)) == datetime(2026, 10, 20, 7, 0, 30)
+
+@pytest.mark.parametrize("text", ["fortnightly", "every:0", "every:99999999999", "on:2026-13-01", "", "except:2026-01-01"])
+def test_recurrence_rejects_bad_rules(text):
+    with pytest.raises(ValueError):
+        Recurrence.parse(text, datetime(2026, 10, 19))
+
+def test_recurrence_needs_a_start():
+    with pytest.raises(ValueError):
+        Recurrence.parse("daily")
+
+def test_recurrence_caps_the_interval():
+    with pytest.raises(ValueError):
+        Recurrence(datetime(2026, 10, 19), every=Recurrence.MAX_EVERY + 1)
+    assert Recurrence(datetime(2026, 10, 19), every=Recurrence.MAX_EVERY).every == Recurrence.MAX_EVERY
+
+@pytest.mark.parametrize("text", ["daily", f"every:{Recurrence.MAX_EVERY}"])
+def test_recurrence_stops_at_date_max(text):
+    rule = Recurrence.parse(text, datetime(9999, 12, 31, 7, 0))
+    assert rule.next(datetime(9999, 12, 30)) == datetime(9999, 12, 31, 7, 0)
+    assert rule.next(datetime(9999, 12, 31, 7, 0)) is None
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = AlarmEngine(AlarmStore(str(tmp_path / "alarms.db")), lambda ids: None)
+    yield engine
+    engine.close()
+
+def test_load_skips_bad_rows(engine):
+    store = engine.store
+    good = store.add(datetime(2026, 10, 20, 7, 0).timestamp(), "good")
+    bad_rule = store.add(datetime(2026, 10, 20, 7, 0).timestamp(), "bad rule", "from:2026-10-19T07:00 every:99999999")
+    bad_zone = store.add(datetime(2026, 10, 20, 7, 0).timestamp(), "bad zone", None, "Mars/Olympus_Mons")
+    skipped = engine.load(now=datetime(2026, 10, 19, 12, 0))
+    assert [alarm_id for alarm_id, _ in skipped] == [bad_rule, bad_zone]
+    assert list(engine.alarms) == [good]
+    assert not engine.rules and not engine.zones
+    assert len(store.load()) == 3
+
+@pytest.mark.parametrize("text", ["nan", "9, nan", "inf", "1e9", "0", "-5", ""])
+def test_snooze_policy_rejects_bad_intervals(text):
+    with pytest.raises(ValueError):
+        SnoozePolicy(SnoozePolicy.parse_intervals(text))
+
+def test_snooze_policy_backs_off_and_escalates():
+    policy = SnoozePolicy(SnoozePolicy.parse_intervals("9, 5, 3"), escalate_after=2, escalate_ringtone="loud.wav")
+    assert [policy.minutes(count) for count in (1, 2, 3, 7)] == [9, 5, 3, 3]
+    assert [policy.ringtone(count, "soft.wav") for count in (1, 2)] == ["soft.wav", "loud.wav"]
+
+class Recorder:
+    def __init__(self):
+        self.groups = []
+        self.fired = threading.Event()
+
+    def __call__(self, group):
+        self.groups.append(sorted(group))
+        self.fired.set()
+
+@pytest.fixture
+def scheduler():
+    made = []
+
+    def make(on_fire=lambda group: None, window=AlarmScheduler.WINDOW):
+        made.append(AlarmScheduler(on_fire, window))
+        return made[-1]
+
+    yield make
+    for s in made:
+        s.stop()
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+def test_scheduler_fires_due_alarms_as_one_group(scheduler):
+    recorder = Recorder()
+    s = scheduler(recorder)
+    now = time.time()
+    s.schedule_many((alarm_id, now - 3 + alarm_id * 0.5) for alarm_id in range(5))
+    assert recorder.fired.wait(5)
+    time.sleep(0.1)
+    assert recorder.groups == [[0, 1, 2, 3, 4]]
+    assert len(s) == 0
+
+def test_scheduler_splits_groups_outside_the_window(scheduler):
+    recorder = Recorder()
+    s = scheduler(recorder, window=0.05)
+    now = time.time()
+    s.schedule_many([(1, now - 1), (2, now - 0.99), (3, now + 0.3)])
+    assert wait_for(lambda: len(recorder.groups) == 2)
+    assert recorder.groups == [[1, 2], [3]]
+
+def test_cancelled_and_rescheduled_alarms(scheduler):
+    recorder = Recorder()
+    s = scheduler(recorder)
+    now = time.time()
+    s.schedule(1, now + 1000)
+    s.schedule(2, now + 1000)
+    s.schedule(3, now + 1000)
+    s.cancel(2)
+    s.reschedule(3, now - 1)
+    s.schedule(1, now - 1)
+    assert recorder.fired.wait(5)
+    time.sleep(0.1)
+    assert recorder.groups == [[1, 3]]
+    assert s.next_deadline() is None
+
+def test_cancel_compacts_tombstones(scheduler):
+    s = scheduler()
+    now = time.time()
+    s.schedule_many((alarm_id, now + 1000 + alarm_id) for alarm_id in range(10))
+    for alarm_id in range(5):
+        s.cancel(alarm_id)
+    assert len(s._heap) == 10 and s._stale == 5
+    s.cancel(5)
+    assert len(s._heap) == 4 and s._stale == 0
+    assert len(s) == 4
+    assert s.next_deadline() == now + 1006
+
+def test_cancelled_head_is_skipped(scheduler):
+    s = scheduler()
+    now = time.time()
+    s.schedule_many((alarm_id, now + 1000 + alarm_id) for alarm_id in range(10))
+    s.cancel(0)
+    assert s.next_deadline() == now + 1001
+
+@pytest.mark.parametrize("batch, heapified", [(5, False), (50, True)])
+def test_schedule_many_pushes_small_batches(scheduler, monkeypatch, batch, heapified):
+    s = scheduler()
+    now = time.time()
+    s.schedule_many((alarm_id, now + 1000 + alarm_id) for alarm_id in range(100))
+    calls = []
+    heapify = heapq.heapify
+    monkeypatch.setattr(alarm_core.heapq, "heapify", lambda heap: (calls.append(len(heap)), heapify(heap)))
+    s.schedule_many((100 + i, now + 500 - i) for i in range(batch))
+    assert bool(calls) == heapified
+    assert len(s) == 100 + batch
+    assert s.next_deadline() == now + 501 - batch
+    heap = s._heap
+    assert all(heap[(i - 1) // 2] <= heap[i] for i in range(1, len(heap)))
+
+def test_load_rolls_forward_and_expires(engine):
+    now = datetime(2026, 10, 19, 12, 0)
+    store = engine.store
+    future = store.add(datetime(2026, 10, 20, 7, 0).timestamp(), "future")
+    missed = store.add(datetime(2026, 10, 17, 7, 0).timestamp(), "missed")
+    weekly = store.add(datetime(2026, 10, 12, 7, 0).timestamp(), "weekly", "from:2026-10-12T07:00 days:mon")
+    ran_out = store.add(datetime(2026, 10, 1, 7, 0).timestamp(), "ran out", "from:2026-10-01T07:00 on:2026-10-01")
+
+    assert engine.load(now=now) == []
+    assert engine.alarms == {
+        future: (datetime(2026, 10, 20, 7, 0), "future"),
+        missed: (datetime(2026, 10, 20, 7, 0), "missed"),
+        weekly: (datetime(2026, 10, 26, 7, 0), "weekly"),
+    }
+    assert ran_out not in engine.rules
+    stored = {alarm_id: fire_at for alarm_id, fire_at, *_ in store.load()}
+    assert stored == {alarm_id: alarm_time.timestamp() for alarm_id, (alarm_time, _) in engine.alarms.items()}
+    assert len(engine.scheduler) == 3
+
+def test_complete_many_moves_repeating_and_deletes_one_shot(engine):
+    now = datetime.now().replace(microsecond=0)
+    once, daily = engine.add_many([(now + timedelta(hours=1), "once"), (now + timedelta(hours=1), "daily", "daily")])
+    moved, deleted = engine.complete_many([once, daily], now=now + timedelta(hours=1))
+    assert (moved, deleted) == ([daily], [once])
+    assert engine.alarms[daily][0] == now + timedelta(days=1, hours=1)
+    assert [row[0] for row in engine.store.load()] == [daily]
@@ -0,0 +1,35 @@
+import csv
+import io
+
+import pytest
+
+import alarm_io
+
+def test_non_utf8_csv_is_a_file_error():
+    data = "time,name\n07:30,ok\n08:00,Caf\xe9\n".encode("latin-1")
+    report = alarm_io.ImportReport("latin1.csv")
+    with pytest.raises(alarm_io.FileFormatError):
+        list(alarm_io.read_alarms(io.TextIOWrapper(io.BytesIO(data), encoding="utf-8"), report))
+
+def test_non_utf8_ics_is_a_file_error():
+    data = "BEGIN:VCALENDAR\r\nBEGIN:VEVENT\r\nSUMMARY:Caf\xe9\r\n".encode("latin-1")
+    report = alarm_io.ImportReport("latin1.ics")
+    with pytest.raises(alarm_io.FileFormatError):
+        list(alarm_io.read_alarms(io.TextIOWrapper(io.BytesIO(data), encoding="utf-8"), report, ics=True))
+
+def test_oversized_field_rejects_only_its_row():
+    limit = csv.field_size_limit(50)
+    try:
+        report = alarm_io.ImportReport("big.csv")
+        items = list(alarm_io.read_alarms(io.StringIO("time,name\n07:30,a\n07:31," + "x" * 100 + "\n07:32,c\n"), report))
+    finally:
+        csv.field_size_limit(limit)
+    assert [name for _, name, *_ in items] == ["a", "c"]
+    assert report.accepted == 2 and report.rejected == 1
+
+def test_bad_rows_are_reported_and_skipped():
+    report = alarm_io.ImportReport("rows.csv")
+    text = "time,name,repeat,zone,sound\n07:30,ok,,,\nbad,Bad,,,\n09:00,Zone,,Mars/Base,\n"
+    items = list(alarm_io.read_alarms(io.StringIO(text), report))
+    assert [name for _, name, *_ in items] == ["ok"]
+    assert [error.split(":")[0] for error in report.errors] == ["line 3", "line 4"]
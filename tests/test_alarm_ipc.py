@@ -0,0 +1,141 @@
+import io
+import json
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+import alarm_ipc
+from alarm_core import AlarmEngine, AlarmStore, deferred_call
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="needs Unix sockets")
+
+def call_now(func, *args):
+    future, run = deferred_call(func, *args)
+    run()
+    return future
+
+def wait_listening(path):
+    # The socket file appears at bind(), a moment before the server listens.
+    deadline = time.monotonic() + 5
+    while not alarm_ipc.socket_in_use(path) and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+@pytest.fixture
+def server(tmp_path):
+    engine = AlarmEngine(AlarmStore(str(tmp_path / "alarms.db")), lambda ids: None)
+    path = str(tmp_path / "control.sock")
+    control = alarm_ipc.ControlServer(path, call_now, {
+        "add": engine.add_many,
+        "delete": engine.delete,
+        "snooze": engine.snooze,
+        "list": engine.iter_alarms,
+    }).start()
+    wait_listening(path)
+    yield path, engine
+    control.stop()
+    # The store belongs to the server thread, which ran every call.
+    engine.scheduler.stop()
+
+def run_client(path, lines, monkeypatch, capsys):
+    monkeypatch.setattr("sys.stdin", io.StringIO("".join(line + "\n" for line in lines)))
+    status = alarm_ipc.main(["--socket", path])
+    return status, [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+def test_bad_line_in_piped_adds_keeps_the_others(server, monkeypatch, capsys):
+    path, engine = server
+    status, replies = run_client(path, [
+        json.dumps({"op": "add", "time": "07:30", "name": "first"}),
+        json.dumps({"op": "add", "time": "99:99", "name": "bad"}),
+        json.dumps({"op": "add", "time": "08:15", "name": "third"}),
+        json.dumps({"op": "list"}),
+    ], monkeypatch, capsys)
+
+    assert status == 1
+    assert [reply.get("ok") for reply in replies[:3]] == [True, False, True]
+    assert "99:99" in replies[1]["error"]
+    listed = [reply for reply in replies[3:] if "ok" not in reply]
+    assert sorted(alarm["name"] for alarm in listed) == ["first", "third"]
+    assert replies[-1] == {"ok": True, "count": 2}
+    assert sorted(name for _, name in engine.alarms.values()) == ["first", "third"]
+
+def test_list_streams_in_pages(server, monkeypatch, capsys):
+    path, engine = server
+    monkeypatch.setattr(alarm_ipc, "BATCH_SIZE", 2)
+    adds = [json.dumps({"op": "add", "time": f"07:{minute:02d}", "name": f"alarm {minute}"}) for minute in range(5)]
+    status, replies = run_client(path, adds + [json.dumps({"op": "list"})], monkeypatch, capsys)
+
+    assert status == 0
+    listed = [reply for reply in replies[5:] if "ok" not in reply]
+    assert [alarm["name"] for alarm in listed] == [f"alarm {minute}" for minute in range(5)]
+    assert replies[-1] == {"ok": True, "count": 5}
+
+def test_bulk_add_reports_errors_per_item(server, monkeypatch, capsys):
+    path, engine = server
+    status, replies = run_client(path, [json.dumps({"op": "bulk-add", "alarms": [
+        {"time": "07:30"},
+        {"time": "07:30", "zone": "Mars/Base"},
+        {"time": "07:30", "repeat": "on:2001-01-01"},
+        {"time": "2099-01-01T07:30:00+00:00", "zone": "Europe/Paris"},
+        {"time": "2001-01-01T07:30:00"},
+        {"time": "07:30", "name": {"x": 1}},
+        {"time": "07:30", "sound": [1]},
+        {"time": "2099-01-01T07:30:00+00:00", "name": "aware"},
+    ]})], monkeypatch, capsys)
+
+    assert status == 1
+    reply, = replies
+    assert reply["ids"][0] is not None and reply["ids"][-1] is not None
+    assert reply["ids"][1:-1] == [None] * 6
+    assert [error["index"] for error in reply["errors"]] == [1, 2, 3, 4, 5, 6]
+    assert len(engine.alarms) == 2
+
+def test_snooze_minutes_are_bounded(server, monkeypatch, capsys):
+    path, engine = server
+    status, replies = run_client(path, [json.dumps({"op": "add", "time": "07:30", "name": "wake"})],
+                                 monkeypatch, capsys)
+    alarm_id = replies[0]["id"]
+    status, replies = run_client(path, [
+        json.dumps({"op": "snooze", "id": alarm_id, "minutes": minutes}) for minutes in (1e300, -600, "nan", 10)
+    ], monkeypatch, capsys)
+
+    assert status == 1
+    assert [reply["ok"] for reply in replies] == [False, False, False, True]
+    assert engine.alarms[alarm_id][0] > datetime.now() + timedelta(minutes=9)
+
+def test_handler_failure_still_gets_a_reply(tmp_path, monkeypatch, capsys):
+    def broken():
+        raise RuntimeError("store is gone")
+
+    path = str(tmp_path / "broken.sock")
+    control = alarm_ipc.ControlServer(path, call_now, {"list": broken}).start()
+    wait_listening(path)
+    try:
+        status, replies = run_client(path, [json.dumps({"op": "list"}), json.dumps({"op": "list"})],
+                                     monkeypatch, capsys)
+    finally:
+        control.stop()
+
+    assert status == 1
+    assert replies == [{"ok": False, "error": "RuntimeError: store is gone"}] * 2
+
+def test_second_server_leaves_a_running_socket_alone(server):
+    path, engine = server
+    assert alarm_ipc.socket_in_use(path)
+    assert alarm_ipc.start_server(call_now, {}, path) is None
+    assert alarm_ipc.socket_in_use(path)
+
+def test_stale_socket_file_is_not_in_use(tmp_path):
+    path = str(tmp_path / "stale.sock")
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(path)
+    stale.close()
+    assert os.path.exists(path)
+    assert not alarm_ipc.socket_in_use(path)
+
+def test_socket_path_prefers_runtime_dir(tmp_path, monkeypatch):
+    monkeypatch.delenv("ALARM_SOCKET", raising=False)
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    assert alarm_ipc.default_socket_path() == str(tmp_path / "alarm_app.sock")
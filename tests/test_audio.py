@@ -0,0 +1,24 @@
+from array import array
+
+import pytest
+
+from audio import CHANNELS, RATE, Pcm, WavSource
+
+def pcm(frames, rate, value=1000):
+    return Pcm(memoryview(array("h", [value] * frames * CHANNELS).tobytes()), rate)
+
+@pytest.mark.parametrize("rate, sounding", [(RATE, 10), (RATE // 2, 20), (RATE * 2, 5)])
+def test_one_shot_ends_in_silence(rate, sounding):
+    source = WavSource(pcm(10, rate))
+    out = array("h", source.read(32))
+    assert len(out) == 32 * CHANNELS
+    assert set(out[:sounding * CHANNELS]) == {1000}
+    assert set(out[sounding * CHANNELS:]) == {0}
+    assert source.finished
+    assert source.read(32) is None
+
+def test_looping_source_wraps_around():
+    source = WavSource(pcm(10, RATE // 2), loop=True)
+    for _ in range(5):
+        assert set(array("h", source.read(32))) == {1000}
+    assert not source.finished
@@ -0,0 +1,51 @@
+import os
+
+import pytest
+
+tk = pytest.importorskip("tkinter")
+
+import sans
+
+# Redraws must move or reconfigure existing canvas items, never add new
+# ones. Needs a display; on a headless machine run under Xvfb, e.g.
+# `xvfb-run python -m pytest tests/test_canvas_items.py`.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        pytest.skip("no display")
+    monkeypatch.setenv("ALARM_DB", str(tmp_path / "alarms.db"))
+    monkeypatch.setenv("ALARM_SOCKET", "off")
+    monkeypatch.setenv("ALARM_AUDIO", "null")
+    monkeypatch.setenv("ALARM_ICON_CACHE", str(tmp_path / "icons"))
+    monkeypatch.chdir(ROOT)
+    app = sans.AlarmApp(root)
+    root.update()
+    yield app
+    app.engine.close()
+    root.destroy()
+
+def test_clock_and_theme_redraws_keep_item_counts(app):
+    before = app.canvas_item_counts()
+    for _ in range(50):
+        app.update_clock()
+    for name in list(app.themes) * 3:
+        app.apply_theme(name)
+        app.master.update_idletasks()
+    assert app.canvas_item_counts() == before
+
+def test_stopwatch_redraws_keep_item_count(app):
+    page = app.show_page(sans.StopwatchPage)
+    app.master.update()
+    before = sans.canvas_item_count(page.canvas)
+    for step in range(200):
+        page.elapsed = step * 0.37
+        page.update_display()
+    for name in list(app.themes) * 3:
+        app.apply_theme(name)
+    app.master.update_idletasks()
+    assert sans.canvas_item_count(page.canvas) == before